@@ -0,0 +1,79 @@
+"""Benchmark memory per cached song: per-song dicts (before) vs Song records (after).
+
+    python bench_records.py [--songs 20000]
+
+Builds an XML document of songs from the stand-in library (standin_airsonic.py:
+12 songs per album, 4 albums per artist), then measures with tracemalloc what stays
+allocated once the document is parsed into the dicts the tools used to build, or
+the interned Song records they build now, and the ElementTree is dropped. Also
+reports the time to extract the fields per song.
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from records import Song
+from standin_airsonic import Library, element
+
+
+def legacy_song(song) -> dict:
+    """Song extraction as it was before records.py (one dict per song, nothing shared)"""
+    return {
+        "id": song.get("id"),
+        "title": song.get("title", "Unknown"),
+        "artist": song.get("artist", "Unknown"),
+        "album": song.get("album", "Unknown"),
+        "duration": song.get("duration", "0"),
+        "track": int(song.get("track", "0") or 0),
+        "disc": int(song.get("discNumber", "1") or 1),
+        "year": int(song.get("year", "0") or 0),
+        "genre": song.get("genre", "Unknown"),
+        "bitrate": int(song.get("bitRate", "0") or 0),
+        "bpm": int(song.get("bpm", "0") or 0),
+        "play_count": int(song.get("playCount", "0") or 0),
+        "starred": song.get("starred") is not None,
+    }
+
+
+def measure(parse, xml: str):
+    """(bytes retained per song, microseconds per song to extract it) for caching parse(e)"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    # ElementTree creates a new string object for every attribute value, as it does for
+    # real Airsonic responses, so repeated artists are only shared if the parser interns them
+    elements = ET.fromstring(xml).findall("song")
+    started = time.perf_counter()
+    cached = [parse(e) for e in elements]
+    elapsed = time.perf_counter() - started
+    del elements
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size / len(cached), elapsed / len(cached) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--songs", type=int, default=20000)
+    args = parser.parse_args()
+
+    library = Library(args.songs)
+    xml = "<songs>" + "".join(element("song", library.song(n)) for n in range(args.songs)) + "</songs>"
+
+    print(f"{args.songs} songs ({args.songs // 12} albums, {args.songs // 48} artists)\n")
+    print(f"{'':<22}{'bytes/song':>12}{'us/song':>10}")
+    results = {}
+    for label, parse in (("dict (before)", legacy_song), ("Song record (after)", Song.from_element)):
+        results[label] = measure(parse, xml)
+        print(f"{label:<22}{results[label][0]:>12.0f}{results[label][1]:>10.2f}")
+
+    before, after = results["dict (before)"][0], results["Song record (after)"][0]
+    print(f"\n{before / after:.1f}x less memory per cached song "
+          f"({(before - after) * 1_000_000 / 2**20:.0f} MB saved per million songs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark stdio server start-up: import time, cold start to tools/list, first tool call.
+
+    python bench_stdio.py [--runs 20] [--tool get_current_song] [--args '{}'] [--budget-ms 150]
+
+Cold start is measured from spawning `python stdio_server.py` to reading its tools/list
+response, so it includes interpreter start-up. The first call defaults to
+get_current_song, which answers without contacting Airsonic when nothing is playing;
+pass --tool/--args to time a real upstream call. Exits with status 1 when the median
+cold start exceeds --budget-ms.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_SNIPPET = (
+    "import time; started = time.perf_counter(); import {module}; "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def import_ms(module: str) -> float:
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET.format(module=module)], cwd=HERE)
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def spawn_ms() -> float:
+    started = time.perf_counter()
+    subprocess.check_call([sys.executable, "-c", "pass"], cwd=HERE)
+    return (time.perf_counter() - started) * 1000
+
+
+def read_response(process, request_id):
+    """Read lines until the response to request_id (skipping notifications)"""
+    while True:
+        line = process.stdout.readline()
+        if not line:
+            raise RuntimeError("stdio server exited: " + process.stderr.read().decode())
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def send(process, message):
+    process.stdin.write((json.dumps(message) + "\n").encode())
+    process.stdin.flush()
+
+
+def cold_start(tool: str, arguments: dict):
+    """(ms to tools/list response, ms for the first tools/call) for one fresh process"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, os.path.join(HERE, "stdio_server.py")],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        send(process, {"jsonrpc": "2.0", "id": 1, "method": "initialize",
+                       "params": {"protocolVersion": "2025-06-18", "capabilities": {},
+                                  "clientInfo": {"name": "bench", "version": "0"}}})
+        send(process, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+        send(process, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+        read_response(process, 2)
+        listed = time.perf_counter()
+
+        send(process, {"jsonrpc": "2.0", "id": 3, "method": "tools/call",
+                       "params": {"name": tool, "arguments": arguments}})
+        response = read_response(process, 3)
+        called = time.perf_counter()
+        if "error" in response:
+            raise RuntimeError(f"{tool} failed: {response['error']['message']}")
+        return (listed - started) * 1000, (called - listed) * 1000
+    finally:
+        process.stdin.close()
+        process.wait(timeout=10)
+
+
+def describe(values):
+    return (f"median {statistics.median(values):6.1f} ms   "
+            f"min {min(values):6.1f} ms   max {max(values):6.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--tool", default="get_current_song")
+    parser.add_argument("--args", default="{}", help="JSON arguments for --tool")
+    parser.add_argument("--budget-ms", type=float, default=150)
+    args = parser.parse_args()
+
+    print(f"Python {sys.version.split()[0]}, {args.runs} runs each\n")
+    print(f"{'spawn bare interpreter':<24}{describe([spawn_ms() for _ in range(args.runs)])}")
+    for module in ("toolAirsonic", "stdio_server", "main"):
+        try:
+            print(f"{'import ' + module:<24}{describe([import_ms(module) for _ in range(args.runs)])}")
+        except subprocess.CalledProcessError:
+            print(f"{'import ' + module:<24}not importable here")
+
+    listed, called = zip(*(cold_start(args.tool, json.loads(args.args)) for _ in range(args.runs)))
+    print(f"\n{'spawn to tools/list':<24}{describe(listed)}")
+    print(f"{'first ' + args.tool:<24}{describe(called)}")
+
+    median = statistics.median(listed)
+    verdict = "within" if median <= args.budget_ms else "OVER"
+    print(f"\nCold start {verdict} the {args.budget_ms:g} ms budget")
+    sys.exit(0 if median <= args.budget_ms else 1)
+
+
+if __name__ == "__main__":
+    main()
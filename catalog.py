@@ -0,0 +1,276 @@
+import re
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from records import Song
+
+# Numeric columns and their dtypes
+NUMERIC_COLUMNS = {
+    "duration": np.int32,
+    "year": np.int16,
+    "bitrate": np.int16,
+    "bpm": np.int16,
+    "play_count": np.int32,
+    "starred": np.bool_,
+}
+
+# Numeric columns where 0 means the tag is missing: rows without it only match "= 0"
+OPTIONAL_COLUMNS = ("year", "bitrate", "bpm")
+
+# String columns stored as integer codes into a StringPool
+STRING_COLUMNS = ("artist", "album", "genre")
+
+# Text fields that can be filtered: the interned columns plus titles
+TEXT_FIELDS = STRING_COLUMNS + ("title",)
+
+FILTER_PATTERN = re.compile(r"^\s*(\w+)\s*(>=|<=|!=|==|=|<|>|~)\s*(.+?)\s*$", re.DOTALL)
+
+# A quoted string, a clause separator ('and', '&&' or ','), or any other character
+CLAUSE_TOKEN = re.compile(r"""('[^']*'|"[^"]*")|(\s+and\s+|\s*&&\s*|\s*,\s*)|[\s\S]""", re.IGNORECASE)
+
+# "90s", "00s", "1990s"
+DECADE_PATTERN = re.compile(r"(\d{2}|\d{3}0)s")
+
+
+class StringPool:
+    """Interns repeated strings (artists, albums, genres) as int32 codes"""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+    def matching_codes(self, op: str, value: str) -> np.ndarray:
+        """Codes whose string matches value (case-insensitive equality or substring)"""
+        needle = value.lower()
+        if op == "~":
+            matches = [i for i, v in enumerate(self.values) if needle in v.lower()]
+        else:
+            matches = [i for i, v in enumerate(self.values) if v.lower() == needle]
+        return np.array(matches, dtype=np.int32)
+
+    def nbytes(self) -> int:
+        return sum(sys.getsizeof(v) for v in self.values) + sys.getsizeof(self.codes) + sys.getsizeof(self.values)
+
+
+def decade_start(raw: str) -> Optional[int]:
+    """First year of a decade written as "90s" (1990), "00s" (2000) or "1990s", else None"""
+    if not DECADE_PATTERN.fullmatch(raw):
+        return None
+    digits = raw[:-1]
+    if len(digits) == 4:
+        return int(digits)
+    # Two digits: 00s-20s are this century, the rest the last one
+    return (2000 if digits[0] in "012" else 1900) + int(digits)
+
+
+def parse_value(field: str, raw: str):
+    """Convert a filter value to the column's type ("4:00" is allowed for durations)"""
+    raw = raw.strip().strip("'\"")
+    if field in TEXT_FIELDS:
+        return raw
+    if field == "starred":
+        return raw.lower() in ("1", "true", "yes")
+    if field == "duration" and ":" in raw:
+        minutes, seconds = raw.split(":", 1)
+        return int(minutes) * 60 + int(seconds)
+    return int(float(raw))
+
+
+def split_clauses(expression: str) -> List[str]:
+    """Split a filter on 'and', '&&' and ',' outside quoted values"""
+    parts, current = [], []
+    for match in CLAUSE_TOKEN.finditer(expression):
+        if match.group(2) is not None:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(match.group(0))
+    parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def year_clauses(op: str, raw: str) -> Optional[List[Tuple[str, str, object]]]:
+    """Clauses for a year compared with a decade ("year=90s" is 1990-1999), else None"""
+    start = decade_start(raw.strip().strip("'\""))
+    if start is None:
+        return None
+    end = start + 9
+    if op == "=":
+        return [("year", ">=", start), ("year", "<=", end)]
+    if op == "!=":
+        return [("year", "!=", range(start, end + 1))]
+    # Before the decade, up to its end, after it, or from its start
+    return [("year", op, start if op in ("<", ">=") else end)]
+
+
+def parse_filter(expression: str) -> List[Tuple[str, str, object]]:
+    """Parse 'year>=1990 and duration<4:00 and genre=Jazz' into (field, op, value) clauses"""
+    clauses = []
+    if not expression or not expression.strip():
+        return clauses
+    for part in split_clauses(expression):
+        match = FILTER_PATTERN.match(part)
+        if not match:
+            raise ValueError(f"Invalid filter clause: '{part}'")
+        field, op, raw = match.groups()
+        field = field.lower()
+        op = "=" if op == "==" else op
+        if field not in NUMERIC_COLUMNS and field not in TEXT_FIELDS:
+            raise ValueError(f"Unknown field '{field}'")
+        if op == "~" and field not in TEXT_FIELDS:
+            raise ValueError(f"'~' only applies to text fields, not '{field}'")
+        decade = year_clauses(op, raw) if field == "year" else None
+        clauses.extend(decade or [(field, op, parse_value(field, raw))])
+    return clauses
+
+
+def parse_sort(expression: str) -> List[Tuple[str, bool]]:
+    """Parse '-play_count,year' into [(field, descending)]"""
+    keys = []
+    if not expression or not expression.strip():
+        return keys
+    for part in expression.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        descending = part.startswith("-")
+        field = part.lstrip("+-").lower()
+        if field not in NUMERIC_COLUMNS and field not in TEXT_FIELDS:
+            raise ValueError(f"Unknown sort field '{field}'")
+        keys.append((field, descending))
+    return keys
+
+
+class SongCatalog:
+    """Columnar, in-memory copy of the song library for vectorized filtering"""
+
+    def __init__(self, songs: Iterable[Song]):
+        pools = {name: StringPool() for name in STRING_COLUMNS}
+        ids, titles = [], []
+        numeric = {name: [] for name in NUMERIC_COLUMNS}
+        codes = {name: [] for name in STRING_COLUMNS}
+
+        for song in songs:
+            ids.append(song.id)
+            titles.append(song.title)
+            for name in NUMERIC_COLUMNS:
+                numeric[name].append(getattr(song, name) or 0)
+            for name in STRING_COLUMNS:
+                codes[name].append(pools[name].code(getattr(song, name) or "Unknown"))
+
+        self.pools = pools
+        self.ids = np.array(ids, dtype=object)
+        self.titles = np.array(titles, dtype=object)
+        self.title_ranks: Optional[np.ndarray] = None  # Sort ranks of the titles, built on first use
+        self.columns: Dict[str, np.ndarray] = {}
+        for name, dtype in NUMERIC_COLUMNS.items():
+            info = np.iinfo(dtype) if dtype is not np.bool_ else None
+            values = np.array(numeric[name], dtype=np.int64 if info else np.bool_)
+            if info:
+                values = np.clip(values, info.min, info.max)
+            self.columns[name] = values.astype(dtype)
+        for name in STRING_COLUMNS:
+            self.columns[name] = np.array(codes[name], dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def mask(self, clauses: List[Tuple[str, str, object]]) -> np.ndarray:
+        """Evaluate filter clauses as a single boolean mask over all rows"""
+        mask = np.ones(len(self), dtype=np.bool_)
+        for field, op, value in clauses:
+            if field == "title":
+                needle = value.lower()
+                if op == "~":
+                    matches = np.fromiter((needle in t.lower() for t in self.titles), np.bool_, len(self))
+                else:
+                    matches = np.fromiter((t.lower() == needle for t in self.titles), np.bool_, len(self))
+                mask &= ~matches if op == "!=" else matches
+                continue
+            column = self.columns[field]
+            if field in OPTIONAL_COLUMNS and op != "=":
+                # A song without a year is not "before 1960", nor outside the 90s
+                mask &= column != 0
+            if isinstance(value, range):
+                # year!=90s: outside the decade
+                mask &= ~np.isin(column, np.arange(value.start, value.stop))
+            elif field in STRING_COLUMNS:
+                matches = np.isin(column, self.pools[field].matching_codes(op, value))
+                mask &= ~matches if op == "!=" else matches
+            elif op == "=":
+                mask &= column == value
+            elif op == "!=":
+                mask &= column != value
+            elif op == "<":
+                mask &= column < value
+            elif op == "<=":
+                mask &= column <= value
+            elif op == ">":
+                mask &= column > value
+            elif op == ">=":
+                mask &= column >= value
+        return mask
+
+    def sort_key(self, field: str) -> np.ndarray:
+        if field == "title":
+            # Titles are not pooled: rank the rows themselves, once per catalog
+            if self.title_ranks is None:
+                order = np.argsort(np.array([t.lower() for t in self.titles], dtype=object), kind="stable")
+                self.title_ranks = np.empty(len(order), dtype=np.int32)
+                self.title_ranks[order] = np.arange(len(order), dtype=np.int32)
+            return self.title_ranks
+        column = self.columns[field]
+        if field in STRING_COLUMNS:
+            # Sort by the string itself, not by its interning order
+            order = np.argsort(np.array([v.lower() for v in self.pools[field].values], dtype=object))
+            ranks = np.empty(len(order), dtype=np.int32)
+            ranks[order] = np.arange(len(order), dtype=np.int32)
+            return ranks[column]
+        return column
+
+    def query(self, filter_expression: str = "", sort_expression: str = "",
+              limit: Optional[int] = None) -> Tuple[np.ndarray, int]:
+        """Return (row indices, total matches) for a filter and sort expression"""
+        clauses = parse_filter(filter_expression)
+        sort_keys = parse_sort(sort_expression)
+
+        rows = np.flatnonzero(self.mask(clauses))
+        total = len(rows)
+        if sort_keys and total:
+            # np.lexsort sorts by the last key first
+            keys = []
+            for field, descending in reversed(sort_keys):
+                key = self.sort_key(field)[rows].astype(np.int64)
+                keys.append(-key if descending else key)
+            rows = rows[np.lexsort(keys)]
+        if limit is not None:
+            rows = rows[:limit]
+        return rows, total
+
+    def row(self, index: int) -> Song:
+        """Materialize one row as a Song (track and disc are not kept in the catalog)"""
+        fields = {name: self.columns[name][index].item() for name in NUMERIC_COLUMNS}
+        for name in STRING_COLUMNS:
+            fields[name] = self.pools[name].values[self.columns[name][index]]
+        return Song(id=self.ids[index], title=self.titles[index], **fields)
+
+    def nbytes(self) -> int:
+        """Approximate memory footprint of the catalog in bytes"""
+        total = sum(column.nbytes for column in self.columns.values())
+        total += self.ids.nbytes + self.titles.nbytes
+        total += sum(sys.getsizeof(v) for v in self.ids) + sum(sys.getsizeof(v) for v in self.titles)
+        total += sum(pool.nbytes() for pool in self.pools.values())
+        if self.title_ranks is not None:
+            total += self.title_ranks.nbytes
+        return total
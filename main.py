@@ -1,17 +1,33 @@
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
+from fastapi.responses import JSONResponse, HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import html
 import json
+import os
+import threading
+import time
 import requests
+from urllib.parse import parse_qs, urlparse
 
-from models import ModelContextRequest, ModelContextResponse
+from pydantic import BaseModel
+from scheduler import AdmissionController, OverloadedError
+from profiling import ProfilingMiddleware, SlowRequestLog, current_trace, sample_stacks, span
+from progress import current_progress
+from mcp_http import EventStream, SessionStore, accepts_event_stream
+from traffic import TrafficRecorder, TrafficRecorderMiddleware
+from streaming import (
+    BITRATE_LADDER, SegmentCache, ThroughputEstimator, choose_bitrate, chunked, clamp_bitrate, measure_stream,
+    rewrite_playlist
+)
 from toolAirsonic import (
     ALL_TOOLS,
-    search_songs,
-    list_songs,
-    list_albums,
-    get_random_songs,
-    play_song,
+    tool_registry,
+    list_tools,
+    prepare_tool_call,
     pause_playback,
     resume_playback,
     stop_playback,
@@ -19,37 +35,112 @@ from toolAirsonic import (
     set_volume,
     mute,
     unmute,
-    get_current_song,
-    get_playlists,
-    play_playlist,
+    play_next,
+    song_ended,
+    get_scrobbler,
+    peek_suggest_index,
+    draw_random_songs,
+    search_song_records,
+    suggest_warmup,
     playback_state,
     load_config,
-    get_airsonic_auth_params
+    backend_config,
+    routed,
+    get_airsonic_auth_params,
+    parse_xml_response
 )
+from models import DEFAULT_PROTOCOL_VERSION, Tool, negotiate_protocol_version
 
 app = FastAPI()
 
+# Legacy verb-based request/response format
+class ModelContextRequest(BaseModel):
+    verb: str
+    tool_name: Optional[str] = None
+    arguments: Optional[Dict[str, Any]] = None
+
+class ModelContextResponse(BaseModel):
+    tools: Optional[List[Tool]] = None
+    result: Optional[Any] = None
+
+def load_startup_config():
+    """Optional server settings from config.json (defaults apply if it is missing)"""
+    try:
+        return load_config()
+    except Exception:
+        return {}
+
+def create_admission_controller():
+    """Build the tool scheduler from the optional admission settings in config.json"""
+    config = load_startup_config()
+    return AdmissionController(
+        interactive_workers=int(config.get("interactive_workers", 4)),
+        bulk_workers=int(config.get("bulk_workers", 8)),
+        bulk_per_client=int(config.get("bulk_per_client", 2)),
+        bulk_deadline=float(config.get("bulk_deadline", 15))
+    )
+
+admission = create_admission_controller()
+throughput = ThroughputEstimator()
+segment_cache = SegmentCache(int(load_startup_config().get("hls_cache_mb", 256)) * 1024 * 1024)
+
+# Opt-in request profiling (Server-Timing headers, /debug/slow, /debug/profile)
+profiling_enabled = bool(load_startup_config().get("profiling")) or os.environ.get("AIRSONIC_MCP_PROFILING") == "1"
+slow_requests = SlowRequestLog(int(load_startup_config().get("profiling_slow_requests", 50)))
+if profiling_enabled:
+    app.add_middleware(ProfilingMiddleware, slow_requests=slow_requests)
+
+# Opt-in traffic recording for replay_traffic.py (scrubbed of credentials)
+traffic_log = os.environ.get("AIRSONIC_MCP_RECORD") or load_startup_config().get("traffic_log")
+if traffic_log:
+    app.add_middleware(TrafficRecorderMiddleware, recorder=TrafficRecorder(traffic_log))
+
+# Streamable HTTP sessions on /mcp, and the tool calls answered over SSE
+mcp_sessions = SessionStore(ttl=float(load_startup_config().get("mcp_session_ttl", 3600)))
+tool_call_tasks = set()
+
+# Upstream segment URLs of proxied HLS playlists: (song_id, bitrate) -> [url]
+hls_segments = OrderedDict()
+hls_segments_lock = threading.Lock()
+MAX_HLS_PLAYLISTS = 256
+
 # Mount static files from theme folder
 app.mount("/theme", StaticFiles(directory="theme"), name="theme")
 
-# Tool registry mapping function names to functions
-tool_registry = {
-    "search_songs": search_songs,
-    "list_songs": list_songs,
-    "list_albums": list_albums,
-    "get_random_songs": get_random_songs,
-    "play_song": play_song,
-    "pause_playback": pause_playback,
-    "resume_playback": resume_playback,
-    "stop_playback": stop_playback,
-    "seek_to": seek_to,
-    "set_volume": set_volume,
-    "mute": mute,
-    "unmute": unmute,
-    "get_current_song": get_current_song,
-    "get_playlists": get_playlists,
-    "play_playlist": play_playlist,
-}
+
+def get_client_id(request: Request) -> str:
+    """Identify the caller for per-client limits (Cloudflare Tunnel forwards the real IP)"""
+    forwarded = request.headers.get("cf-connecting-ip") or request.headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+async def execute_tool(tool_name: str, arguments: dict, request: Request):
+    """Run a registered tool through the admission controller"""
+    tool_call = prepare_tool_call(tool_name, arguments)
+    
+    trace = current_trace.get()
+    if trace is not None:
+        trace.name = tool_name
+    
+    def call():
+        # Time in the tool itself, outside config/auth/upstream/parse, is result formatting
+        with span("format"):
+            return tool_call()
+    
+    return await admission.run(tool_name, call, client=get_client_id(request))
+
+def overloaded_error(request_id, error: OverloadedError):
+    """JSON-RPC error for a shed bulk call"""
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {
+            "code": -32000,
+            "message": str(error),
+            "data": {"retry_after": error.retry_after}
+        }
+    }
 
 # Root endpoint - handle initial connection/discovery
 @app.get("/")
@@ -64,7 +155,9 @@ async def root():
             "tools/list": "/tools/list",
             "tools/call": "/tools/call",
             "player": "/player",
-            "stream": "/stream/{song_id}"
+            "stream": "/stream/{song_id}",
+            "hls": "/hls/{song_id}/playlist.m3u8",
+            "mcp": "/mcp"
         }
     }
 
@@ -143,22 +236,8 @@ async def mcp_tools_list(request: Request):
     except:
         pass
     
-    # Build tools list from ALL_TOOLS
-    tools = [
-        {
-            "name": tool.name,
-            "description": tool.description,
-            "inputSchema": {
-                "type": "object",
-                "properties": {
-                    param.name: {"type": param.type}
-                    for param in tool.parameters
-                },
-                "required": [param.name for param in tool.parameters]
-            }
-        }
-        for tool in ALL_TOOLS
-    ]
+    # Same schema as /mcp and the stdio server
+    tools = list_tools()
     
     # Always return JSON-RPC 2.0 format for Groq compatibility
     response = {
@@ -198,20 +277,7 @@ async def mcp_tools_call(request: Request):
             }
         
         try:
-            tool_function = tool_registry[tool_name]
-            
-            # Filter out empty string arguments (Groq sometimes sends empty strings)
-            filtered_arguments = {k: v for k, v in arguments.items() if v != "" and v is not None}
-            
-            # Get function signature to check if it accepts arguments
-            import inspect
-            sig = inspect.signature(tool_function)
-            param_names = list(sig.parameters.keys())
-            
-            # Only pass arguments that the function actually accepts
-            final_arguments = {k: v for k, v in filtered_arguments.items() if k in param_names}
-            
-            result = tool_function(**final_arguments)
+            result = await execute_tool(tool_name, arguments, request)
             
             response = {
                 "content": [
@@ -228,6 +294,8 @@ async def mcp_tools_call(request: Request):
                 "id": request_id,
                 "result": response
             }
+        except OverloadedError as e:
+            return overloaded_error(request_id, e)
         except Exception as e:
             return {
                 "jsonrpc": "2.0",
@@ -256,31 +324,97 @@ async def mcp_tools_call(request: Request):
             }
         }
 
+# Pinned hls.js build for browsers without native HLS (see hls_js_integrity in the README)
+HLS_JS_URL = "https://cdn.jsdelivr.net/npm/hls.js@1.5.20/dist/hls.min.js"
+
+def hls_js_tag(config: dict) -> str:
+    """Script tag loading hls.js in HLS mode; off-site copies are only loaded with an SRI hash"""
+    if config.get("stream_mode") != "hls":
+        return ""
+    src = html.escape(config.get("hls_js_url", HLS_JS_URL))
+    integrity = config.get("hls_js_integrity")
+    if integrity:
+        return f'<script src="{src}" integrity="{html.escape(integrity)}" crossorigin="anonymous"></script>'
+    if src.startswith("/") and not src.startswith("//"):
+        # Vendored under this server (e.g. /theme/hls.min.js)
+        return f'<script src="{src}"></script>'
+    # Without a hash only native HLS (Safari, iOS) is used; other browsers stream progressively
+    return ""
+
 # Player endpoint - serve HTML player
 @app.get("/player")
 async def player():
     """Serve the web audio player"""
     with open("player.html", "r") as f:
-        return HTMLResponse(content=f.read())
+        content = f.read()
+    tag = hls_js_tag(load_startup_config())
+    return HTMLResponse(content=content.replace('<!-- hls.js (only when stream_mode is "hls") -->', tag))
+
+def get_bitrate_cap(config: dict, client: str, requested: Optional[int]) -> Optional[int]:
+    """Per-client cap: the smallest of the request, the client's configured cap and the global cap"""
+    caps = [requested, config.get("client_max_bitrate", {}).get(client), config.get("max_bitrate")]
+    caps = [int(cap) for cap in caps if cap]
+    return min(caps) if caps else None
+
+def throughput_recorder(client: str):
+    """on_measured callback for measure_stream that feeds the client's throughput estimate"""
+    def on_measured(nbytes, seconds):
+        kbps = throughput.record(client, nbytes, seconds)
+        if kbps is not None:
+            playback_state["measured_throughput_kbps"] = round(kbps)
+    return on_measured
 
 # Stream proxy endpoint - proxy Airsonic streams
 @app.get("/stream/{song_id}")
-async def stream_song(song_id: str):
-    """Proxy audio stream from Airsonic"""
+async def stream_song(song_id: str, request: Request, maxBitRate: Optional[int] = None,
+                      timeOffset: Optional[int] = None):
+    """Proxy audio stream from Airsonic, picking a bitrate from the client's measured throughput.
+    
+    timeOffset (seconds) makes Airsonic start transcoding at that position, so a seek
+    far into a long track does not download everything before it.
+    """
     try:
-        config = load_config()
+        # Namespaced ids ("home:123") go to their own backend
+        with routed(song_id) as raw_id:
+            config = backend_config()
+            auth_params = get_airsonic_auth_params()
         server_url = config.get("server_url", "http://localhost:4040")
-        auth_params = get_airsonic_auth_params()
-        auth_params["id"] = song_id
+        auth_params["id"] = raw_id
+        
+        client = get_client_id(request)
+        cap = get_bitrate_cap(config, client, maxBitRate)
+        bitrate = choose_bitrate(throughput.estimate(client), cap)
+        if timeOffset:
+            # Airsonic only honours timeOffset when it transcodes
+            auth_params["timeOffset"] = timeOffset
+            bitrate = bitrate or cap or BITRATE_LADDER[-1]
+        if bitrate:
+            auth_params["maxBitRate"] = bitrate
+            auth_params["format"] = config.get("transcode_format", "mp3")
+        playback_state["stream_bitrate"] = bitrate
         
         stream_url = f"{server_url}/rest/stream.view"
         
         # Stream the audio from Airsonic
-        response = requests.get(stream_url, params=auth_params, stream=True, timeout=30)
+        requested_at = time.monotonic()
+        response = await run_in_threadpool(requests.get, stream_url, params=auth_params, stream=True, timeout=30)
         response.raise_for_status()
+        upstream_seconds = time.monotonic() - requested_at
+        
+        on_measured = throughput_recorder(client)
+        
+        def on_finished(nbytes, first_chunk_seconds):
+            playback_state["last_stream_stats"] = {
+                "song_id": song_id,
+                "time_offset": timeOffset or 0,
+                "bitrate": bitrate,
+                "bytes": nbytes,
+                "time_to_audio_ms": round((first_chunk_seconds + upstream_seconds) * 1000)
+                if first_chunk_seconds is not None else None
+            }
         
         return StreamingResponse(
-            response.iter_content(chunk_size=8192),
+            measure_stream(response.iter_content(chunk_size=8192), on_measured, on_finished),
             media_type=response.headers.get("Content-Type", "audio/mpeg"),
             headers={
                 "Content-Disposition": f'inline; filename="song_{song_id}.mp3"'
@@ -289,12 +423,182 @@ async def stream_song(song_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error streaming song: {str(e)}")
 
+# HLS endpoints - proxy Airsonic's hls.m3u8 and serve segments from the segment cache
+def fetch_hls_playlist(song_id: str, bitrate: int) -> Tuple[str, List[str]]:
+    """Fetch and rewrite Airsonic's HLS playlist, remembering the upstream segment URLs.
+    
+    Returns the rewritten playlist and the segment URLs.
+    """
+    with routed(song_id) as raw_id:
+        config = backend_config()
+        params = get_airsonic_auth_params()
+    server_url = config.get("server_url", "http://localhost:4040")
+    params.update({"id": raw_id, "bitRate": bitrate})
+    
+    response = requests.get(f"{server_url}/rest/hls.m3u8", params=params, timeout=30)
+    response.raise_for_status()
+    if response.text.lstrip().startswith("<"):
+        # Airsonic reports errors as a subsonic-response document
+        parse_xml_response(response)
+        raise Exception("Airsonic did not return an HLS playlist")
+    
+    playlist, segment_urls = rewrite_playlist(response.text, response.url, f"/hls/{song_id}/{bitrate}")
+    with hls_segments_lock:
+        hls_segments[(song_id, bitrate)] = segment_urls
+        hls_segments.move_to_end((song_id, bitrate))
+        while len(hls_segments) > MAX_HLS_PLAYLISTS:
+            hls_segments.popitem(last=False)
+    return playlist, segment_urls
+
+def fetch_hls_segment(song_id: str, bitrate: int, index: int) -> Optional[bytes]:
+    """Return a segment from the cache, fetching it from Airsonic on a miss"""
+    key = (song_id, bitrate, index)
+    data = segment_cache.get(key)
+    if data is not None:
+        return data
+    
+    with hls_segments_lock:
+        segment_urls = hls_segments.get((song_id, bitrate))
+        if segment_urls is not None:
+            hls_segments.move_to_end((song_id, bitrate))
+    if segment_urls is None:
+        _, segment_urls = fetch_hls_playlist(song_id, bitrate)
+    if index >= len(segment_urls):
+        return None
+    
+    url = segment_urls[index]
+    # Airsonic signs segment URLs itself (jwt); add credentials only when they are missing
+    query = parse_qs(urlparse(url).query)
+    with routed(song_id):
+        params = None if ("jwt" in query or "u" in query) else get_airsonic_auth_params()
+    response = requests.get(url, params=params, timeout=30)
+    response.raise_for_status()
+    data = response.content
+    segment_cache.put(key, data)
+    return data
+
+@app.get("/hls/{song_id}/playlist.m3u8")
+async def hls_playlist(song_id: str, request: Request, maxBitRate: Optional[int] = None):
+    """HLS playlist for a song at a bitrate chosen like the progressive stream"""
+    try:
+        config = load_config()
+        client = get_client_id(request)
+        cap = get_bitrate_cap(config, client, maxBitRate)
+        # HLS is always transcoded, so "original" falls back to the cap or the top of the ladder
+        bitrate = choose_bitrate(throughput.estimate(client), cap) or cap or BITRATE_LADDER[-1]
+        playback_state["stream_bitrate"] = bitrate
+        
+        playlist, _ = await run_in_threadpool(fetch_hls_playlist, song_id, bitrate)
+        return Response(
+            content=playlist,
+            media_type="application/vnd.apple.mpegurl",
+            headers={"Cache-Control": "no-cache"}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error loading HLS playlist: {str(e)}")
+
+@app.get("/hls/{song_id}/{bitrate}/{index}.ts")
+async def hls_segment(song_id: str, bitrate: int, index: int, request: Request):
+    """A single HLS segment; segment URLs never change, so they are cacheable by Cloudflare.
+    
+    Sending each segment is timed to its last byte and feeds the client's throughput
+    estimate, which picks the bitrate of the next HLS playlist (or progressive stream).
+    """
+    try:
+        # Only ladder bitrates reach Airsonic and the cache
+        data = await run_in_threadpool(fetch_hls_segment, song_id, clamp_bitrate(bitrate), index)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Error loading HLS segment: {str(e)}")
+    if data is None:
+        raise HTTPException(status_code=404, detail="Segment not found")
+    return StreamingResponse(
+        measure_stream(chunked(data), throughput_recorder(get_client_id(request)), probe_bytes=len(data)),
+        media_type="video/mp2t",
+        headers={"Cache-Control": "public, max-age=86400, immutable", "Content-Length": str(len(data))}
+    )
+
+# Debug endpoints - only available when profiling is enabled
+@app.get("/debug/slow")
+async def debug_slow():
+    """Slowest recent requests with their timing breakdown"""
+    if not profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return JSONResponse(content={"slowest": slow_requests.slowest()})
+
+@app.get("/debug/profile")
+async def debug_profile(seconds: float = 10, interval_ms: float = 5):
+    """Sample all threads for a fixed window and return folded stacks for a flamegraph"""
+    if not profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    seconds = min(max(seconds, 0.1), 60)
+    folded = await run_in_threadpool(sample_stacks, seconds, max(interval_ms, 1) / 1000)
+    return Response(content=folded, media_type="text/plain")
+
 # API endpoint to get current playback state
 @app.get("/api/playback/state")
 async def get_playback_state():
     """Get current playback state for player"""
     return JSONResponse(content=playback_state)
 
+# Song lists for the web player, as records rather than tool text
+@app.get("/api/songs/random")
+async def random_songs(request: Request, count: int = 50):
+    """Random songs, scheduled like the get_random_songs tool"""
+    try:
+        count = min(max(count, 1), 500)
+        songs = await admission.run("get_random_songs", lambda: draw_random_songs(count),
+                                    client=get_client_id(request))
+        return JSONResponse(content={"songs": [song._asdict() for song in songs]})
+    except OverloadedError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503,
+                            headers={"Retry-After": str(int(e.retry_after))})
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@app.get("/api/songs/search")
+async def search_song_list(request: Request, q: str = ""):
+    """Songs matching q on every backend, scheduled like the search_songs tool"""
+    try:
+        songs, problems = await admission.run("search_songs", lambda: search_song_records(q),
+                                              client=get_client_id(request))
+        return JSONResponse(content={"songs": [song._asdict() for song in songs], "problems": problems})
+    except OverloadedError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=503,
+                            headers={"Retry-After": str(int(e.retry_after))})
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+# As-you-type search suggestions
+@app.get("/api/suggest")
+async def suggest(q: str = "", limit: int = 5):
+    """Songs, artists and albums with a word starting with q.
+    
+    Until the index is built (in the background, started by the first request) the
+    answer is empty with "warming": true, so keystrokes never wait on a library crawl.
+    """
+    try:
+        index = peek_suggest_index()
+        if index is None:
+            warming = {"songs": [], "artists": [], "albums": [], "warming": True}
+            if suggest_warmup["error"]:
+                warming["error"] = suggest_warmup["error"]
+            return JSONResponse(content=warming)
+        return JSONResponse(content=index.suggest(q, min(max(limit, 1), 20)))
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+# Scrobble queue metrics
+@app.get("/api/scrobble/stats")
+async def scrobble_stats():
+    """Queue depth, spilled plays and flush latency of the background scrobbler"""
+    try:
+        scrobbler = get_scrobbler()
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+    if scrobbler is None:
+        return JSONResponse(content={"enabled": False})
+    return JSONResponse(content=dict(scrobbler.stats(), enabled=True))
+
 # API endpoint to update playback state
 @app.post("/api/playback/control")
 async def control_playback(request: Request):
@@ -304,163 +608,247 @@ async def control_playback(request: Request):
         action = body.get("action")
         
         if action == "pause":
-            result = pause_playback()
+            tool_name, func = "pause_playback", pause_playback
         elif action == "resume":
-            result = resume_playback()
+            tool_name, func = "resume_playback", resume_playback
         elif action == "stop":
-            result = stop_playback()
+            tool_name, func = "stop_playback", stop_playback
         elif action == "seek":
             time_seconds = body.get("time_seconds", 0)
             if time_seconds < 0:
                 # Clear seek position
                 playback_state["seek_position"] = None
-                result = "Seek position cleared"
-            else:
-                result = seek_to(int(time_seconds))
+                playback_state["seek_url"] = None
+                return JSONResponse(content={"status": "success", "message": "Seek position cleared"})
+            tool_name, func = "seek_to", lambda: seek_to(int(time_seconds))
         elif action == "set_volume":
             volume = body.get("volume", 100)
-            result = set_volume(int(volume))
+            tool_name, func = "set_volume", lambda: set_volume(int(volume))
         elif action == "mute":
-            result = mute()
+            tool_name, func = "mute", mute
         elif action == "unmute":
-            result = unmute()
+            tool_name, func = "unmute", unmute
+        elif action == "next":
+            tool_name, func = "play_next", play_next
+        elif action == "ended":
+            tool_name, func = "play_next", song_ended
         else:
             return JSONResponse(content={"error": "Invalid action"}, status_code=400)
         
+        result = await admission.run(tool_name, func, client=get_client_id(request))
         return JSONResponse(content={"status": "success", "message": result})
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
 
-# Legacy MCP endpoint for backward compatibility
-@app.post("/mcp")
-async def mcp_endpoint(request: Request):
-    """MCP endpoint - handles JSON-RPC 2.0 and legacy format"""
+# MCP endpoint - Streamable HTTP transport, plus the legacy verb format
+def jsonrpc_error(request_id, code: int, message: str) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {
+            "code": code,
+            "message": message
+        }
+    }
+
+async def tool_call_message(request_id, params: dict, request: Request) -> dict:
+    """Run a tools/call request and return its JSON-RPC response"""
+    tool_name = params.get("name")
+    arguments = params.get("arguments", {})
+    
+    if tool_name not in tool_registry:
+        return jsonrpc_error(request_id, -32601, f"Tool {tool_name} not found")
+    
     try:
-        body = await request.json()
-        
-        # Check if it's JSON-RPC 2.0 format
-        if "jsonrpc" in body and "method" in body:
-            method = body["method"]
-            params = body.get("params", {})
-            
-            if method == "initialize":
-                return {
-                    "jsonrpc": "2.0",
-                    "id": body.get("id"),
-                    "result": {
-                        "protocolVersion": "2024-11-05",
-                        "capabilities": {
-                            "tools": {}
-                        },
-                        "serverInfo": {
-                            "name": "airsonic-mcp",
-                            "version": "1.0.0"
-                        }
-                    }
-                }
-            
-            elif method == "tools/list":
-                tools = [
+        result = await execute_tool(tool_name, arguments, request)
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": {
+                "content": [
                     {
-                        "name": tool.name,
-                        "description": tool.description,
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                param.name: {"type": param.type}
-                                for param in tool.parameters
-                            },
-                            "required": [param.name for param in tool.parameters]
-                        }
+                        "type": "text",
+                        "text": str(result)
                     }
-                    for tool in ALL_TOOLS
                 ]
-                return {
-                    "jsonrpc": "2.0",
-                    "id": body.get("id"),
-                    "result": {
-                        "tools": tools
-                    }
+            }
+        }
+    except OverloadedError as e:
+        return overloaded_error(request_id, e)
+    except Exception as e:
+        return jsonrpc_error(request_id, -32603, f"Error executing tool: {str(e)}")
+
+async def jsonrpc_message(body: dict, request: Request, protocol_version: str) -> dict:
+    """JSON-RPC response for a request received on /mcp"""
+    method = body["method"]
+    params = body.get("params") or {}
+    request_id = body.get("id")
+    
+    if method == "initialize":
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": {
+                "protocolVersion": protocol_version,
+                "capabilities": {
+                    "tools": {}
+                },
+                "serverInfo": {
+                    "name": "airsonic-mcp",
+                    "version": "1.0.0"
                 }
+            }
+        }
+    elif method == "ping":
+        return {"jsonrpc": "2.0", "id": request_id, "result": {}}
+    elif method == "tools/list":
+        return {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "result": {
+                "tools": list_tools()
+            }
+        }
+    elif method == "tools/call":
+        return await tool_call_message(request_id, params, request)
+    return jsonrpc_error(request_id, -32601, f"Method {method} not found")
+
+def event_stream_response(stream: EventStream, after: int = 0, headers: Optional[dict] = None):
+    return StreamingResponse(
+        stream.read(after),
+        media_type="text/event-stream",
+        headers={**(headers or {}), "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def stream_tool_call(body: dict, request: Request, session, headers: dict):
+    """Answer a tools/call over SSE: progress notifications while it runs, then the result.
+    
+    The call runs in a background task, so it completes (and stays replayable for the
+    session) even if the client disconnects and later resumes with Last-Event-ID.
+    """
+    stream = EventStream()
+    if session is not None:
+        session.add_stream(stream)
+    params = body.get("params") or {}
+    progress_token = (params.get("_meta") or {}).get("progressToken")
+    loop = asyncio.get_running_loop()
+    
+    def report(progress, total, message):
+        notification = {"progressToken": progress_token, "progress": progress}
+        if total is not None:
+            notification["total"] = total
+        if message:
+            notification["message"] = message
+        loop.call_soon_threadsafe(stream.publish, {
+            "jsonrpc": "2.0",
+            "method": "notifications/progress",
+            "params": notification
+        })
+    
+    async def run():
+        if progress_token is not None:
+            current_progress.set(report)
+        # The response returns before the call ends, so the call records its own trace
+        trace = current_trace.get()
+        try:
+            stream.publish(await tool_call_message(body.get("id"), params, request))
+        finally:
+            stream.close()
+            if trace is not None:
+                trace.finish()
+                slow_requests.record(trace)
+    
+    task = asyncio.create_task(run())
+    tool_call_tasks.add(task)
+    task.add_done_callback(tool_call_tasks.discard)
+    return event_stream_response(stream, headers=headers)
+
+@app.post("/mcp")
+async def mcp_endpoint(request: Request):
+    """MCP endpoint - Streamable HTTP (JSON-RPC 2.0, optional SSE responses) and legacy format"""
+    try:
+        body = await request.json()
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid JSON")
+    
+    if isinstance(body, dict) and "verb" in body:
+        return await legacy_mcp(body, request)
+    if not isinstance(body, dict) or "jsonrpc" not in body:
+        raise HTTPException(status_code=422, detail="Invalid request format")
+    
+    method = body.get("method")
+    session_id = request.headers.get("mcp-session-id")
+    if method == "initialize":
+        requested = (body.get("params") or {}).get("protocolVersion")
+        session = mcp_sessions.create(negotiate_protocol_version(requested))
+    elif session_id:
+        session = mcp_sessions.get(session_id)
+        if session is None:
+            return JSONResponse(content=jsonrpc_error(body.get("id"), -32001, "Session not found"), status_code=404)
+    else:
+        # Clients that never initialize (older integrations) are served without a session
+        session = None
+    headers = {"Mcp-Session-Id": session.id} if session is not None else {}
+    
+    # Notifications and responses from the client only need an acknowledgement
+    if method is None or "id" not in body:
+        return Response(status_code=202, headers=headers)
+    
+    params = body.get("params") or {}
+    wants_progress = (params.get("_meta") or {}).get("progressToken") is not None
+    if (method == "tools/call" and accepts_event_stream(request.headers.get("accept"))
+            and (wants_progress or not admission.is_interactive(params.get("name")))):
+        return stream_tool_call(body, request, session, headers)
+    
+    protocol_version = session.protocol_version if session is not None else DEFAULT_PROTOCOL_VERSION
+    message = await jsonrpc_message(body, request, protocol_version)
+    return JSONResponse(content=message, headers=headers)
+
+@app.get("/mcp")
+async def mcp_resume(request: Request):
+    """Resume an SSE response after a dropped connection (Last-Event-ID)"""
+    session_id = request.headers.get("mcp-session-id")
+    session = mcp_sessions.get(session_id) if session_id else None
+    if session is None:
+        return JSONResponse(content=jsonrpc_error(None, -32001, "Session not found"), status_code=404 if session_id else 400)
+    
+    last_event_id = request.headers.get("last-event-id")
+    if not last_event_id:
+        # This server never initiates messages, so there is no standalone stream to open
+        return Response(status_code=405, headers={"Allow": "POST, DELETE"})
+    stream, after = session.find_event(last_event_id)
+    if stream is None:
+        return JSONResponse(content=jsonrpc_error(None, -32001, "Stream not found"), status_code=404)
+    return event_stream_response(stream, after, headers={"Mcp-Session-Id": session.id})
+
+@app.delete("/mcp")
+async def mcp_end_session(request: Request):
+    """End an MCP session"""
+    session_id = request.headers.get("mcp-session-id")
+    if not session_id:
+        return JSONResponse(content=jsonrpc_error(None, -32600, "Missing Mcp-Session-Id"), status_code=400)
+    if not mcp_sessions.delete(session_id):
+        return JSONResponse(content=jsonrpc_error(None, -32001, "Session not found"), status_code=404)
+    return Response(status_code=204)
+
+async def legacy_mcp(body: dict, request: Request):
+    """Legacy verb-based format (discovery / execute)"""
+    try:
+        if body["verb"] == "discovery":
+            return ModelContextResponse(tools=ALL_TOOLS)
+        elif body["verb"] == "execute":
+            tool_name = body.get("tool_name")
+            arguments = body.get("arguments", {})
             
-            elif method == "tools/call":
-                tool_name = params.get("name")
-                arguments = params.get("arguments", {})
-                
-                if tool_name not in tool_registry:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "error": {
-                            "code": -32601,
-                            "message": f"Tool {tool_name} not found"
-                        }
-                    }
-                
-                try:
-                    tool_function = tool_registry[tool_name]
-                    
-                    # Filter out empty string arguments and validate against function signature
-                    import inspect
-                    filtered_arguments = {k: v for k, v in arguments.items() if v != "" and v is not None}
-                    sig = inspect.signature(tool_function)
-                    param_names = list(sig.parameters.keys())
-                    final_arguments = {k: v for k, v in filtered_arguments.items() if k in param_names}
-                    
-                    result = tool_function(**final_arguments)
-                    
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "result": {
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": str(result)
-                                }
-                            ]
-                        }
-                    }
-                except Exception as e:
-                    return {
-                        "jsonrpc": "2.0",
-                        "id": body.get("id"),
-                        "error": {
-                            "code": -32603,
-                            "message": f"Error executing tool: {str(e)}"
-                        }
-                    }
-        
-        # Legacy format (verb-based)
-        if "verb" in body:
-            if body["verb"] == "discovery":
-                return ModelContextResponse(tools=ALL_TOOLS)
-            elif body["verb"] == "execute":
-                tool_name = body.get("tool_name")
-                arguments = body.get("arguments", {})
-                
-                if tool_name not in tool_registry:
-                    raise HTTPException(status_code=400, detail=f"Tool {tool_name} not found")
-                
-                tool_function = tool_registry[tool_name]
-                
-                # Filter out empty string arguments and validate against function signature
-                import inspect
-                filtered_arguments = {k: v for k, v in arguments.items() if v != "" and v is not None}
-                sig = inspect.signature(tool_function)
-                param_names = list(sig.parameters.keys())
-                final_arguments = {k: v for k, v in filtered_arguments.items() if k in param_names}
-                
-                result = tool_function(**final_arguments)
-                return ModelContextResponse(result=result)
+            if tool_name not in tool_registry:
+                raise HTTPException(status_code=400, detail=f"Tool {tool_name} not found")
             
-            raise HTTPException(status_code=400, detail=f"Invalid verb: {body['verb']}")
+            result = await execute_tool(tool_name, arguments, request)
+            return ModelContextResponse(result=result)
         
-        # If we get here, the format is unknown
-        raise HTTPException(status_code=422, detail="Invalid request format")
-        
-    except json.JSONDecodeError:
-        raise HTTPException(status_code=400, detail="Invalid JSON")
+        raise HTTPException(status_code=400, detail=f"Invalid verb: {body['verb']}")
+    except OverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after))})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,124 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+# Seconds between SSE comments that keep proxies from closing an idle stream
+HEARTBEAT_SECONDS = 15
+
+# Finished streams kept per session so clients can resume them with Last-Event-ID
+MAX_STREAMS_PER_SESSION = 16
+
+
+def accepts_event_stream(accept_header: Optional[str]) -> bool:
+    return "text/event-stream" in (accept_header or "")
+
+
+class EventStream:
+    """JSON-RPC messages sent on one SSE response, kept for replay.
+
+    Messages get per-stream sequence numbers; the SSE event id is "<stream>:<seq>", so a
+    client that lost the connection can send it back as Last-Event-ID and receive
+    everything after it. publish() and close() must be called on the event loop.
+    """
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.events: List[str] = []
+        self.done = False
+        self.wakeup = asyncio.Event()
+
+    def publish(self, message: Dict):
+        if self.done:
+            return
+        self.events.append(json.dumps(message))
+        self._wake()
+
+    def close(self):
+        self.done = True
+        self._wake()
+
+    def _wake(self):
+        self.wakeup.set()
+        self.wakeup = asyncio.Event()
+
+    async def read(self, after: int = 0) -> AsyncIterator[str]:
+        """SSE text for every message after sequence number `after`, live until the stream closes"""
+        position = after
+        while True:
+            wakeup = self.wakeup
+            while position < len(self.events):
+                position += 1
+                yield f"id: {self.id}:{position}\nevent: message\ndata: {self.events[position - 1]}\n\n"
+            if self.done:
+                return
+            try:
+                await asyncio.wait_for(wakeup.wait(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+
+
+class Session:
+    """State for one Mcp-Session-Id"""
+
+    def __init__(self, protocol_version: str):
+        self.id = uuid.uuid4().hex
+        self.protocol_version = protocol_version
+        self.last_seen = time.monotonic()
+        self.streams: "OrderedDict[str, EventStream]" = OrderedDict()
+
+    def add_stream(self, stream: EventStream):
+        self.streams[stream.id] = stream
+        while len(self.streams) > MAX_STREAMS_PER_SESSION:
+            self.streams.popitem(last=False)
+
+    def find_event(self, last_event_id: str) -> Tuple[Optional[EventStream], int]:
+        """Stream and sequence number a Last-Event-ID refers to (None if unknown)"""
+        stream_id, _, seq = last_event_id.partition(":")
+        stream = self.streams.get(stream_id)
+        if stream is None or not seq.isdigit():
+            return None, 0
+        return stream, int(seq)
+
+
+class SessionStore:
+    """Sessions created by initialize, expired after ttl seconds without requests"""
+
+    def __init__(self, ttl: float = 3600, max_sessions: int = 1000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def create(self, protocol_version: str) -> Session:
+        session = Session(protocol_version)
+        with self.lock:
+            self._expire()
+            self.sessions[session.id] = session
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self.lock:
+            self._expire()
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_seen = time.monotonic()
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def delete(self, session_id: str) -> bool:
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self.sessions:
+            oldest = next(iter(self.sessions.values()))
+            if oldest.last_seen >= cutoff:
+                break
+            self.sessions.popitem(last=False)
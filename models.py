@@ -1,21 +1,23 @@
-from pydantic import BaseModel
-from typing import List, Optional, Any, Dict
+from dataclasses import dataclass
+from typing import List, Optional
 
-class ToolParameter(BaseModel):
+# Plain dataclasses (no pydantic) so the stdio server can load tool definitions quickly
+
+@dataclass
+class ToolParameter:
     name: str
     type: str
 
-class Tool(BaseModel):
+@dataclass
+class Tool:
     name: str
     description: str
     parameters: List[ToolParameter]
 
-class ModelContextRequest(BaseModel):
-    verb: str
-    tool_name: Optional[str] = None
-    arguments: Optional[Dict[str, Any]] = None
-
-class ModelContextResponse(BaseModel):
-    tools: Optional[List[Tool]] = None
-    result: Optional[Any] = None
+# MCP protocol versions this server speaks; Streamable HTTP arrived in 2025-03-26
+SUPPORTED_PROTOCOL_VERSIONS = ("2025-06-18", "2025-03-26", "2024-11-05")
+DEFAULT_PROTOCOL_VERSION = "2024-11-05"
 
+def negotiate_protocol_version(requested: Optional[str]) -> str:
+    """The client's version if supported, otherwise our oldest (most widely supported) one"""
+    return requested if requested in SUPPORTED_PROTOCOL_VERSIONS else DEFAULT_PROTOCOL_VERSION
@@ -0,0 +1,68 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from records import Playlist
+
+
+class PlaylistCache:
+    """Parsed playlists (with their songs) of one server, revalidated against getPlaylists.
+
+    The listing is trusted for list_ttl seconds. A cached playlist is only fetched again
+    when its listing row shows a different `changed` timestamp or songCount, so replaying
+    a large playlist costs one getPlaylists call (or none within list_ttl).
+    """
+
+    def __init__(self, fetch_list: Callable[[], List[Playlist]],
+                 fetch_playlist: Callable[[str], Playlist], list_ttl: float = 30.0):
+        self.fetch_list = fetch_list
+        self.fetch_playlist = fetch_playlist
+        self.list_ttl = list_ttl
+
+        self.infos: Optional[List[Playlist]] = None
+        self.listed_at = 0.0
+        self.playlists: Dict[str, Playlist] = {}
+        self.lock = threading.Lock()
+
+    def listing(self, refresh: bool = False) -> List[Playlist]:
+        with self.lock:
+            if not refresh and self.infos is not None and time.monotonic() - self.listed_at < self.list_ttl:
+                return self.infos
+        infos = self.fetch_list()
+        with self.lock:
+            self.infos = infos
+            self.listed_at = time.monotonic()
+            # Forget playlists that were deleted upstream
+            current = {info.id for info in infos}
+            for playlist_id in [pid for pid in self.playlists if pid not in current]:
+                del self.playlists[playlist_id]
+        return infos
+
+    def get(self, playlist_id: str) -> Playlist:
+        """The playlist with its songs, fetched only if it is new or changed"""
+        info = next((info for info in self.listing() if info.id == playlist_id), None)
+        with self.lock:
+            cached = self.playlists.get(playlist_id)
+        if cached is not None and (info is None or cached.same_version(info)):
+            return cached
+        playlist = self.fetch_playlist(playlist_id)
+        with self.lock:
+            self.playlists[playlist_id] = playlist
+        return playlist
+
+    def find(self, name: str) -> List[Playlist]:
+        """Playlists named `name` (case-insensitive); failing that, those whose name contains it"""
+        needle = name.strip().casefold()
+        infos = self.listing()
+        exact = [info for info in infos if info.name.casefold() == needle]
+        if exact:
+            return exact
+        return [info for info in infos if needle in info.name.casefold()]
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "listed": len(self.infos or []),
+                "cached": len(self.playlists),
+                "cached_songs": sum(len(playlist.songs) for playlist in self.playlists.values()),
+            }
@@ -0,0 +1,174 @@
+import contextvars
+import heapq
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Trace of the request being handled, if profiling is enabled
+current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Per-request timing breakdown.
+
+    Spans are exclusive: time spent in a nested span (e.g. config loading inside auth)
+    is only counted for the innermost one. Spans on worker threads (parallel fan-out)
+    are added up, so phases can exceed the request's wall time.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.name: Optional[str] = None
+        self.started = time.perf_counter()
+        self.total: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def _add(self, phase: str, seconds: float):
+        with self.lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def enter(self, phase: str):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        now = time.perf_counter()
+        if stack:
+            parent, since = stack[-1]
+            self._add(parent, now - since)
+        stack.append((phase, now))
+
+    def exit(self):
+        stack = self.local.stack
+        phase, since = stack.pop()
+        now = time.perf_counter()
+        self._add(phase, now - since)
+        if stack:
+            stack[-1] = (stack[-1][0], now)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (durations in ms); total is the time so far"""
+        with self.lock:
+            entries = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_dict(self) -> Dict:
+        return {
+            "path": self.path,
+            "tool": self.name,
+            "total_ms": round((self.total or 0) * 1000, 1),
+            "phases_ms": {phase: round(seconds * 1000, 1) for phase, seconds in self.phases.items()},
+        }
+
+
+@contextmanager
+def span(phase: str):
+    """Attribute the enclosed time to phase in the current request's trace (no-op when not tracing)"""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    trace.enter(phase)
+    try:
+        yield
+    finally:
+        trace.exit()
+
+
+class SlowRequestLog:
+    """Keeps the N slowest traced requests"""
+
+    def __init__(self, size: int = 50):
+        self.size = size
+        self.heap: List = []
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def record(self, trace: Trace):
+        with self.lock:
+            self.counter += 1
+            entry = (trace.total, self.counter, trace.to_dict())
+            if len(self.heap) < self.size:
+                heapq.heappush(self.heap, entry)
+            elif trace.total > self.heap[0][0]:
+                heapq.heapreplace(self.heap, entry)
+
+    def slowest(self) -> List[Dict]:
+        with self.lock:
+            return [entry[2] for entry in sorted(self.heap, reverse=True)]
+
+
+class ProfilingMiddleware:
+    """ASGI middleware tracing every request into a SlowRequestLog.
+
+    Only added when profiling is enabled, and plain ASGI rather than
+    @app.middleware("http"), so streamed responses (audio, HLS, SSE) pass through
+    untouched. Headers go out before the body, so the Server-Timing total covers the
+    time until the response started; the trace kept for /debug/slow runs to the last byte.
+    SSE responses are not recorded here: their tool call runs in a background task,
+    which records the trace when the call ends.
+    """
+
+    def __init__(self, app, slow_requests: SlowRequestLog, skip_prefixes=("/debug/", "/theme/")):
+        self.app = app
+        self.slow_requests = slow_requests
+        self.skip_prefixes = tuple(skip_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(scope["path"])
+        token = current_trace.set(trace)
+        state = {"event_stream": False}
+
+        async def send_timed(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                state["event_stream"] = any(key.lower() == b"content-type" and b"text/event-stream" in value
+                                            for key, value in headers)
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            current_trace.reset(token)
+            if not state["event_stream"]:
+                trace.finish()
+                self.slow_requests.record(trace)
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """Sample all thread stacks for a while and return them in folded format.
+
+    Each output line is "frame;frame;frame count" (outermost frame first), which
+    flamegraph.pl and speedscope read directly.
+    """
+    sampler = threading.get_ident()
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == sampler:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                filename = code.co_filename.rsplit("/", 1)[-1]
+                frames.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stacks[";".join(reversed(frames))] += 1
+        time.sleep(interval)
+    return "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()) + "\n"
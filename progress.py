@@ -0,0 +1,17 @@
+import contextvars
+from typing import Callable, Optional
+
+# Callback receiving (progress, total, message) for the tool call being run, if the
+# client asked for progress notifications
+current_progress: contextvars.ContextVar = contextvars.ContextVar("current_progress", default=None)
+
+
+def report_progress(progress: float, total: Optional[float] = None, message: Optional[str] = None):
+    """Report progress of a long tool call (no-op when nobody is listening).
+
+    Safe to call from worker threads: run_parallel and the admission controller copy
+    the caller's context, so the callback travels with the work.
+    """
+    callback: Optional[Callable] = current_progress.get()
+    if callback is not None:
+        callback(progress, total, message)
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Set, Tuple
+
+from records import Song
+
+
+class RandomSongPool:
+    """In-memory pool of random songs, refilled in bulk in the background.
+
+    draw(k) pops k songs in O(k) and always returns min(k, library size) songs. Within a
+    cycle a song is not handed out twice; only the last `history` songs served are
+    remembered (default 4 x size), and a new cycle starts whenever a refill cannot find
+    enough songs that were not served yet. When a draw leaves fewer than low_watermark
+    songs, one bulk upstream call refills the pool on a background thread; callers only
+    wait when it runs dry.
+    """
+
+    def __init__(self, fetch: Callable[[int], List[Song]], size: int = 500,
+                 low_watermark: int = 100, max_age: float = 3600.0, history: int = 0):
+        self.fetch = fetch
+        self.size = size
+        self.low_watermark = low_watermark
+        self.max_age = max_age
+        self.history = history or 4 * size
+
+        self.songs: Deque[Tuple[float, Song]] = deque()  # (fetched_at, song), oldest first
+        self.pooled: Set[str] = set()
+        self.served: Set[str] = set()
+        self.served_order: Deque[str] = deque()  # served ids, oldest first
+        self.lock = threading.Lock()
+        self.refill_lock = threading.Lock()
+        self.refilling = False
+
+    def draw(self, count: int) -> List[Song]:
+        with self.lock:
+            songs = self._take(count)
+        # A refill normally covers the rest; retry in case songs expired meanwhile
+        for _ in range(3):
+            if len(songs) >= count:
+                break
+            if not self.refill(count - len(songs), keep={song.id for song in songs}):
+                break  # The library is smaller than count
+            with self.lock:
+                songs += self._take(count - len(songs))
+        self._refill_in_background()
+        return songs
+
+    def _take(self, count: int) -> List[Song]:
+        cutoff = time.time() - self.max_age
+        songs = []
+        while self.songs and len(songs) < count:
+            fetched_at, song = self.songs.popleft()
+            self.pooled.discard(song.id)
+            if fetched_at < cutoff:
+                continue  # Possibly deleted or changed since; drop it
+            if song.id in self.served:
+                continue  # Served since it was pooled (a new cycle started meanwhile)
+            self._mark_served(song.id)
+            songs.append(song)
+        return songs
+
+    def _mark_served(self, song_id: str):
+        self.served.add(song_id)
+        self.served_order.append(song_id)
+        while len(self.served_order) > self.history:
+            self.served.discard(self.served_order.popleft())
+
+    def refill(self, needed: int = 0, keep: Set[str] = frozenset()) -> int:
+        """Top the pool up with one bulk fetch (concurrent callers share it); returns songs added.
+
+        keep: ids the caller is handing out right now, which stay served if a new cycle starts.
+        """
+        with self.refill_lock:
+            with self.lock:
+                if len(self.songs) >= max(needed, self.low_watermark):
+                    return len(self.songs)  # Another caller refilled while we waited
+                wanted = max(self.size - len(self.songs), needed)
+            batch = self.fetch(wanted)
+            fetched_at = time.time()
+            with self.lock:
+                fresh = [song for song in batch if song.id not in self.served]
+                if batch and (not fresh or len(self.songs) + len(fresh) < needed):
+                    # Too few songs left that were not handed out: start a new cycle
+                    self.served.clear()
+                    self.served_order.clear()
+                    for song_id in keep:
+                        self._mark_served(song_id)
+                    fresh = [song for song in batch if song.id not in keep]
+                added = 0
+                for song in fresh:
+                    if song.id not in self.pooled:
+                        self.pooled.add(song.id)
+                        self.songs.append((fetched_at, song))
+                        added += 1
+                return added
+
+    def _refill_in_background(self):
+        with self.lock:
+            if self.refilling or len(self.songs) >= self.low_watermark:
+                return
+            self.refilling = True
+        threading.Thread(target=self._background_refill, name="random-pool", daemon=True).start()
+
+    def _background_refill(self):
+        try:
+            self.refill()
+        except Exception:
+            pass  # The next draw that finds the pool empty retries in the foreground
+        finally:
+            with self.lock:
+                self.refilling = False
+
+    def __len__(self) -> int:
+        return len(self.songs)
@@ -0,0 +1,105 @@
+import sys
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Parsed numeric attributes shared between records: years, durations and bitrates repeat
+# across a library, and each int above 256 would otherwise be a separate 28-byte object
+_numbers: Dict[str, int] = {}
+MAX_SHARED_NUMBERS = 65536
+
+
+def number(value: Optional[str], default: int = 0) -> int:
+    if not value:
+        return default
+    parsed = _numbers.get(value)
+    if parsed is None:
+        parsed = int(value)
+        if len(_numbers) < MAX_SHARED_NUMBERS:
+            _numbers[value] = parsed
+    return parsed
+
+
+def text(element, name: str) -> str:
+    """An attribute that repeats across songs (artist, album, genre), interned"""
+    return sys.intern(element.get(name) or "Unknown")
+
+
+class Song(NamedTuple):
+    """A song as every tool and cache sees it.
+
+    NamedTuples are immutable and have no per-instance __dict__, so a cached song costs
+    a tuple of 13 references; artist, album and genre strings are interned and shared.
+    """
+    id: str
+    title: str
+    artist: str
+    album: str
+    duration: int = 0
+    track: int = 0
+    disc: int = 1
+    year: int = 0
+    genre: str = "Unknown"
+    bitrate: int = 0
+    bpm: int = 0
+    play_count: int = 0
+    starred: bool = False
+
+    @classmethod
+    def from_element(cls, element, song_id: Optional[str] = None) -> "Song":
+        """Parse a <song> or playlist <entry> element (song_id overrides the element's id)"""
+        return cls(
+            song_id or element.get("id"),
+            element.get("title", "Unknown"),
+            text(element, "artist"),
+            text(element, "album"),
+            number(element.get("duration")),
+            number(element.get("track")),
+            number(element.get("discNumber"), 1),
+            number(element.get("year")),
+            text(element, "genre"),
+            number(element.get("bitRate")),
+            number(element.get("bpm")),
+            number(element.get("playCount")),
+            element.get("starred") is not None,
+        )
+
+
+class Album(NamedTuple):
+    id: str
+    name: str
+    artist: str
+    year: int = 0
+    song_count: int = 0
+
+    @classmethod
+    def from_element(cls, element, album_id: Optional[str] = None) -> "Album":
+        """Parse an <album> element (getAlbum, getAlbumList, getArtist or search3)"""
+        return cls(
+            album_id or element.get("id"),
+            sys.intern(element.get("name") or element.get("title") or "Unknown"),
+            text(element, "artist"),
+            number(element.get("year")),
+            number(element.get("songCount")),
+        )
+
+
+class Playlist(NamedTuple):
+    """A playlist; listing rows (getPlaylists) have no songs"""
+    id: str
+    name: str
+    song_count: int = 0
+    changed: str = ""
+    songs: Tuple[Song, ...] = ()
+
+    @classmethod
+    def from_element(cls, element, songs: Tuple[Song, ...] = ()) -> "Playlist":
+        return cls(
+            element.get("id"),
+            element.get("name", "Unknown"),
+            number(element.get("songCount")),
+            element.get("changed", ""),
+            songs,
+        )
+
+    def same_version(self, other: "Playlist") -> bool:
+        """Whether two rows describe the same revision of a playlist"""
+        return self.changed == other.changed and self.song_count == other.song_count
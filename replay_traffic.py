@@ -0,0 +1,296 @@
+"""Replay recorded traffic (traffic_log / AIRSONIC_MCP_RECORD) and report latencies.
+
+    python replay_traffic.py traffic.jsonl --serve [--speed 4] [--config config.json]
+    python replay_traffic.py traffic.jsonl --target http://127.0.0.1:8000 [--speed 1]
+
+Requests are sent open-loop at their recorded offsets divided by --speed (0 sends
+them as fast as the workers allow), with the recorded client aliases mapped to
+distinct X-Forwarded-For addresses and MCP session aliases mapped to the sessions
+the replayed initialize calls create. --serve starts a stand-in Airsonic
+(standin_airsonic.py) and this server wired to it, so nothing leaves the machine;
+--config copies tuning settings (caches, admission limits, ...) from a config file.
+
+Reports count, errors and latency percentiles per tool / endpoint next to the
+recorded median. Errors are transport failures, 5xx, JSON-RPC errors and tool
+results starting with "Error". Exits with status 1 when the error rate exceeds
+--max-error-rate.
+"""
+import argparse
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_log(path: str, limit: Optional[int] = None) -> List[Dict]:
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries.sort(key=lambda entry: entry["t"])
+    return entries[:limit] if limit else entries
+
+
+def group_key(entry: Dict) -> str:
+    """Tool name, JSON-RPC method, or the path with ids replaced by '*'"""
+    if entry.get("tool"):
+        return entry["tool"]
+    if entry.get("rpc"):
+        return entry["rpc"]
+    parts = entry["path"].split("/")
+    parts[2:] = [re.sub(r"^[^.]*\d[^.]*", "*", part) for part in parts[2:]]
+    return f"{entry['method']} {'/'.join(parts)}"
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def response_error(response: requests.Response) -> Optional[str]:
+    """Why a replayed response counts as an error (None if it does not)"""
+    if response.status_code >= 500:
+        return f"HTTP {response.status_code}"
+    if "application/json" not in response.headers.get("Content-Type", ""):
+        return None
+    try:
+        body = response.json()
+    except ValueError:
+        return "invalid JSON"
+    if not isinstance(body, dict):
+        return None
+    if body.get("error"):
+        error = body["error"]
+        return error.get("message", "JSON-RPC error") if isinstance(error, dict) else str(error)
+    for content in (body.get("result") or {}).get("content", []) if isinstance(body.get("result"), dict) else []:
+        if str(content.get("text", "")).startswith("Error"):
+            return content["text"][:120]
+    return None
+
+
+class Replayer:
+    def __init__(self, target: str, speed: float, workers: int, timeout: float):
+        self.target = target.rstrip("/")
+        self.speed = speed
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="replay")
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, str] = {}  # recorded alias -> live Mcp-Session-Id
+        self.clients: Dict[str, str] = {}   # recorded alias -> X-Forwarded-For address
+        self.results = []  # (entry, seconds, ttfb seconds, error)
+        self.lateness: List[float] = []
+
+    def http(self) -> requests.Session:
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session
+
+    def client_address(self, alias: Optional[str]) -> str:
+        with self.lock:
+            if alias not in self.clients:
+                n = len(self.clients) + 1
+                self.clients[alias] = f"10.77.{n // 250}.{n % 250 + 1}"
+            return self.clients[alias]
+
+    def send(self, entry: Dict, scheduled: float):
+        self.lateness.append(max(0.0, time.perf_counter() - scheduled))
+        headers = {"X-Forwarded-For": self.client_address(entry.get("client"))}
+        if entry.get("sse"):
+            headers["Accept"] = "application/json, text/event-stream"
+        alias = entry.get("session")
+        with self.lock:
+            live_session = self.sessions.get(alias) if alias else None
+        if live_session and entry.get("rpc") != "initialize":
+            headers["Mcp-Session-Id"] = live_session
+
+        started = time.perf_counter()
+        ttfb = None
+        error = None
+        try:
+            response = self.http().request(
+                entry["method"], self.target + entry["path"], params=entry.get("query"),
+                json=entry.get("body"), headers=headers, timeout=self.timeout, stream=True
+            )
+            ttfb = time.perf_counter() - started
+            response.content  # Read the whole body, as the recorded client did
+            error = response_error(response)
+            if alias and response.headers.get("Mcp-Session-Id"):
+                with self.lock:
+                    self.sessions[alias] = response.headers["Mcp-Session-Id"]
+        except requests.RequestException as e:
+            error = type(e).__name__
+        with self.lock:
+            self.results.append((entry, time.perf_counter() - started, ttfb, error))
+
+    def run(self, entries: List[Dict]):
+        first = entries[0]["t"]
+        started = time.perf_counter()
+        futures = []
+        for entry in entries:
+            scheduled = started + ((entry["t"] - first) / self.speed if self.speed > 0 else 0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(self.executor.submit(self.send, entry, scheduled))
+        for future in futures:
+            future.result()
+        self.executor.shutdown()
+        return time.perf_counter() - started
+
+
+def report(results, elapsed: float, lateness: List[float]) -> float:
+    groups = defaultdict(list)
+    for result in results:
+        groups[group_key(result[0])].append(result)
+
+    print(f"{'tool / endpoint':<34}{'count':>6}{'errors':>7}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"
+          f"{'ttfb p50':>10}{'recorded p50':>14}")
+    errors = defaultdict(int)
+    for key in sorted(groups, key=lambda k: -len(groups[k])):
+        rows = groups[key]
+        latencies = [seconds * 1000 for _, seconds, _, _ in rows]
+        ttfbs = [ttfb * 1000 for _, _, ttfb, _ in rows if ttfb is not None]
+        recorded = [entry["ms"] for entry, _, _, _ in rows if "ms" in entry]
+        failed = [error for _, _, _, error in rows if error]
+        for error in failed:
+            errors[f"{key}: {error}"] += 1
+        print(f"{key[:33]:<34}{len(rows):>6}{len(failed):>7}"
+              f"{percentile(latencies, .5):>9.1f}{percentile(latencies, .9):>9.1f}"
+              f"{percentile(latencies, .99):>9.1f}{max(latencies):>9.1f}"
+              f"{(statistics.median(ttfbs) if ttfbs else 0):>10.1f}"
+              f"{(statistics.median(recorded) if recorded else 0):>14.1f}")
+
+    total_errors = sum(errors.values())
+    all_latencies = [seconds * 1000 for _, seconds, _, _ in results]
+    print(f"\n{len(results)} requests in {elapsed:.1f}s ({len(results) / elapsed:.1f}/s), "
+          f"{total_errors} errors, p50 {percentile(all_latencies, .5):.1f} ms, "
+          f"p99 {percentile(all_latencies, .99):.1f} ms, "
+          f"max send lag {max(lateness) * 1000:.1f} ms")
+    for error, count in sorted(errors.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {count:>5} x {error}")
+    return total_errors / len(results)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with status {process.returncode}")
+        try:
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not come up at {url}")
+
+
+def start_stack(args, workdir: str):
+    """Stand-in Airsonic plus this server (uvicorn) configured to use it; returns (target, stop)"""
+    # Separate processes, so neither competes with the replay client for the GIL
+    standin_port = free_port()
+    standin = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "standin_airsonic.py"), "--port", str(standin_port),
+         "--songs", str(args.songs), "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms)],
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(f"http://127.0.0.1:{standin_port}/rest/ping.view", standin)
+    except Exception:
+        standin.terminate()
+        raise
+
+    settings = {}
+    if args.config:
+        with open(args.config) as f:
+            settings = json.load(f).get("airsonic", {})
+    settings.pop("backends", None)
+    settings.pop("traffic_log", None)
+    settings.update({
+        "server_url": f"http://127.0.0.1:{standin_port}",
+        "username": "replay",
+        "password": "replay",
+        "scrobble_spill_path": os.path.join(workdir, "scrobble_spill.jsonl"),
+    })
+    config_path = os.path.join(workdir, "config.json")
+    with open(config_path, "w") as f:
+        json.dump({"airsonic": settings}, f)
+
+    port = free_port()
+    env = dict(os.environ, AIRSONIC_MCP_CONFIG=config_path)
+    env.pop("AIRSONIC_MCP_RECORD", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=HERE, env=env
+    )
+    target = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_up(target + "/", server)
+    except Exception:
+        server.terminate()
+        standin.terminate()
+        raise
+
+    def stop():
+        for process in (server, standin):
+            process.terminate()
+            process.wait(timeout=10)
+
+    return target, stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("log", help="JSONL traffic log")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="Server to replay against")
+    parser.add_argument("--serve", action="store_true", help="Start a stand-in Airsonic and a server wired to it")
+    parser.add_argument("--config", help="With --serve: copy settings from this config.json")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier (0 = no pacing)")
+    parser.add_argument("--workers", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--limit", type=int, help="Replay only the first N requests")
+    parser.add_argument("--songs", type=int, default=5000, help="With --serve: stand-in library size")
+    parser.add_argument("--latency-ms", type=float, default=20, help="With --serve: stand-in latency")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="With --serve: stand-in latency jitter")
+    parser.add_argument("--max-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    entries = load_log(args.log, args.limit)
+    if not entries:
+        sys.exit("Empty traffic log")
+    span = entries[-1]["t"] - entries[0]["t"]
+    print(f"{len(entries)} requests recorded over {span:.1f}s, replaying at "
+          f"{'full speed' if args.speed <= 0 else f'{args.speed:g}x'}\n")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        target, stop = start_stack(args, workdir) if args.serve else (args.target, None)
+        try:
+            replayer = Replayer(target, args.speed, args.workers, args.timeout)
+            elapsed = replayer.run(entries)
+        finally:
+            if stop:
+                stop()
+    error_rate = report(replayer.results, elapsed, replayer.lateness)
+    sys.exit(0 if error_rate <= args.max_error_rate else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+# Tools that control playback directly; these must never wait behind listings or crawls
+INTERACTIVE_TOOLS = {
+    "play_song",
+    "play_next",
+    "pause_playback",
+    "resume_playback",
+    "stop_playback",
+    "seek_to",
+    "set_volume",
+    "mute",
+    "unmute",
+    "get_current_song",
+}
+
+
+class OverloadedError(Exception):
+    """Raised when a bulk call is shed because it would miss its deadline"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Runs tool calls in two separate thread pools.
+
+    Interactive tools get their own reserved workers and never queue behind bulk
+    calls. Bulk tools share a bounded pool with a per-client concurrency limit; a
+    bulk call that cannot start before its deadline is rejected with OverloadedError
+    instead of piling up.
+    """
+
+    def __init__(self, interactive_workers: int = 4, bulk_workers: int = 8,
+                 bulk_per_client: int = 2, bulk_deadline: float = 15.0):
+        self.interactive_executor = ThreadPoolExecutor(interactive_workers, thread_name_prefix="interactive")
+        self.bulk_executor = ThreadPoolExecutor(bulk_workers, thread_name_prefix="bulk")
+        self.bulk_workers = bulk_workers
+        self.bulk_per_client = bulk_per_client
+        self.bulk_deadline = bulk_deadline
+
+        self.bulk_active = 0
+        self.bulk_waiting = 0
+        self.client_active: Dict[str, int] = {}
+        self.avg_bulk_seconds = 1.0  # Moving average of bulk call duration
+        self._condition: Optional[asyncio.Condition] = None
+
+    @staticmethod
+    def is_interactive(tool_name: str) -> bool:
+        return tool_name in INTERACTIVE_TOOLS
+
+    @property
+    def condition(self) -> asyncio.Condition:
+        # Created lazily so it binds to the server's running event loop
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def run(self, tool_name: str, func: Callable, client: str = "unknown"):
+        """Run func() in the pool for tool_name's class and return its result"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        if self.is_interactive(tool_name):
+            return await loop.run_in_executor(self.interactive_executor, context.run, func)
+
+        await self._admit_bulk(tool_name, client)
+        started = time.monotonic()
+        try:
+            return await loop.run_in_executor(self.bulk_executor, context.run, func)
+        finally:
+            elapsed = time.monotonic() - started
+            self.avg_bulk_seconds = 0.8 * self.avg_bulk_seconds + 0.2 * elapsed
+            async with self.condition:
+                self.bulk_active -= 1
+                self.client_active[client] -= 1
+                if not self.client_active[client]:
+                    del self.client_active[client]
+                self.condition.notify_all()
+
+    def _can_start(self, client: str) -> bool:
+        return (self.bulk_active < self.bulk_workers
+                and self.client_active.get(client, 0) < self.bulk_per_client)
+
+    def estimated_wait(self) -> float:
+        """Rough time until a newly queued bulk call would start"""
+        if self.bulk_active < self.bulk_workers:
+            return 0.0
+        return (self.bulk_waiting + 1) / self.bulk_workers * self.avg_bulk_seconds
+
+    async def _admit_bulk(self, tool_name: str, client: str):
+        async with self.condition:
+            if not self._can_start(client):
+                wait = self.estimated_wait()
+                if wait > self.bulk_deadline:
+                    self._shed(tool_name, wait)
+
+                self.bulk_waiting += 1
+                try:
+                    await asyncio.wait_for(
+                        self.condition.wait_for(lambda: self._can_start(client)),
+                        timeout=self.bulk_deadline
+                    )
+                except asyncio.TimeoutError:
+                    self._shed(tool_name, self.estimated_wait())
+                finally:
+                    self.bulk_waiting -= 1
+
+            self.bulk_active += 1
+            self.client_active[client] = self.client_active.get(client, 0) + 1
+
+    def _shed(self, tool_name: str, wait: float):
+        retry_after = max(1.0, round(wait, 1))
+        raise OverloadedError(
+            f"Server busy: {tool_name} could not start within {self.bulk_deadline:g}s. "
+            f"Retry in about {retry_after:.0f}s.",
+            retry_after
+        )
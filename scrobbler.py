@@ -0,0 +1,207 @@
+import json
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class PartialSubmitError(Exception):
+    """Raised by a submit function when only part of a batch was delivered"""
+
+    def __init__(self, message: str, unsent_ids: List[str]):
+        super().__init__(message)
+        self.unsent_ids = unsent_ids
+
+
+class ScrobbleReporter:
+    """Reports now-playing and completed plays to Airsonic off the request path.
+
+    Events are queued and flushed by a background thread: completed plays are sent in
+    batches (scrobble.view accepts repeated id/time pairs) and only the latest
+    now-playing event is sent. While Airsonic is unreachable, completed plays are
+    spilled to a bounded JSONL file and retried with exponential backoff.
+
+    submit may raise PartialSubmitError (e.g. when one of several backends is down), in
+    which case only the plays it names are spilled and retried.
+    """
+
+    def __init__(self, submit: Callable[[Dict], None], spill_path: str = "scrobble_spill.jsonl",
+                 max_batch: int = 50, flush_interval: float = 5.0, max_spill: int = 10000,
+                 max_backoff: float = 300.0):
+        self.submit = submit
+        self.spill_path = spill_path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_spill = max_spill
+        self.max_backoff = max_backoff
+
+        self.events: "queue.Queue" = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread: Optional[threading.Thread] = None
+        self.backoff = 0.0
+        self.retry_at = 0.0
+
+        self.metrics = {
+            "submitted": 0,
+            "failed_flushes": 0,
+            "spilled": self._count_spilled(),
+            "dropped_spill_lines": 0,
+            "last_flush_ms": None,
+            "last_error": None,
+        }
+
+    def now_playing(self, song_id: str):
+        self._enqueue({"id": song_id, "submission": False, "time": int(time.time() * 1000)})
+
+    def played(self, song_id: str, played_at: Optional[float] = None):
+        self._enqueue({"id": song_id, "submission": True, "time": int((played_at or time.time()) * 1000)})
+
+    def _enqueue(self, event: Dict):
+        self.events.put(event)
+        self._ensure_started()
+
+    def _ensure_started(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="scrobbler", daemon=True)
+                self.thread.start()
+
+    def stats(self) -> Dict:
+        return dict(self.metrics, queue_depth=self.events.qsize(), backoff_seconds=self.backoff)
+
+    def _run(self):
+        while True:
+            try:
+                self._step()
+            except Exception as e:
+                # Keep reporting: a bad event or spill file must not end the thread
+                self.metrics["last_error"] = f"Reporter error: {str(e)}"
+                time.sleep(self.flush_interval)
+
+    def _step(self):
+        """Collect one batch of events and send it (spilling plays while Airsonic is down)"""
+        batch = self._collect()
+        now_playing = [event for event in batch if not event["submission"]]
+        plays = [event for event in batch if event["submission"]]
+
+        if time.monotonic() >= self.retry_at and now_playing:
+            # Only the latest now-playing event matters
+            self._send([now_playing[-1]], submission=False)
+
+        if time.monotonic() < self.retry_at:
+            # Backing off: keep completed plays on disk, drop stale now-playing
+            self._spill(plays)
+        elif self._flush_plays(plays):
+            self._drain_spill()
+
+    def _collect(self) -> List[Dict]:
+        """Wait for the next event, then gather whatever else arrives within flush_interval"""
+        timeout = None if not self.metrics["spilled"] else self.flush_interval
+        try:
+            batch = [self.events.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.events.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _flush_plays(self, plays: List[Dict]) -> bool:
+        for start in range(0, len(plays), self.max_batch):
+            chunk = plays[start:start + self.max_batch]
+            unsent = self._send(chunk, submission=True)
+            if unsent:
+                # Plays that did get through are not spilled, or they would be counted twice
+                self._spill(unsent + plays[start + self.max_batch:])
+                return False
+        return True
+
+    def _send(self, events: List[Dict], submission: bool) -> List[Dict]:
+        """Submit events, returning the ones that were not delivered"""
+        started = time.perf_counter()
+        try:
+            self.submit({
+                "id": [event["id"] for event in events],
+                "time": [event["time"] for event in events],
+                "submission": "true" if submission else "false",
+            })
+        except Exception as e:
+            if isinstance(e, PartialSubmitError):
+                unsent_ids = set(e.unsent_ids)
+                unsent = [event for event in events if event["id"] in unsent_ids]
+            else:
+                unsent = events
+            if submission:
+                self.metrics["submitted"] += len(events) - len(unsent)
+            self.metrics["failed_flushes"] += 1
+            self.metrics["last_error"] = str(e)
+            self.backoff = min(self.max_backoff, max(1.0, self.backoff * 2))
+            self.retry_at = time.monotonic() + self.backoff
+            return unsent
+        self.metrics["last_flush_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if submission:
+            self.metrics["submitted"] += len(events)
+        self.backoff = 0.0
+        self.retry_at = 0.0
+        return []
+
+    def _spill(self, plays: List[Dict]):
+        """Append plays to the spill file, keeping only the newest max_spill entries"""
+        if not plays:
+            return
+        try:
+            lines = self._read_spill() + [json.dumps(event) for event in plays]
+            lines = lines[-self.max_spill:]
+            with open(self.spill_path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            self.metrics["spilled"] = len(lines)
+        except OSError as e:
+            self.metrics["last_error"] = f"Spill failed: {str(e)}"
+
+    def _drain_spill(self):
+        """Resend spilled plays once Airsonic is reachable again"""
+        lines = self._read_spill()
+        if not lines:
+            return
+        plays = self._parse_spill(lines)
+        try:
+            os.remove(self.spill_path)
+        except OSError:
+            pass
+        self.metrics["spilled"] = 0
+        self._flush_plays(plays)
+
+    def _parse_spill(self, lines: List[str]) -> List[Dict]:
+        """Spilled plays, skipping lines that are not complete events (e.g. cut off by a crash)"""
+        plays = []
+        for line in lines:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                event = None
+            if isinstance(event, dict) and "id" in event and "time" in event:
+                plays.append(dict(event, submission=True))
+            else:
+                self.metrics["dropped_spill_lines"] += 1
+                self.metrics["last_error"] = f"Dropped unreadable spill line: {line[:80]}"
+        return plays
+
+    def _read_spill(self) -> List[str]:
+        try:
+            with open(self.spill_path, "r", errors="replace") as f:
+                return [line for line in f.read().splitlines() if line.strip()]
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            self.metrics["last_error"] = f"Reading spill failed: {str(e)}"
+            return []
+
+    def _count_spilled(self) -> int:
+        return len(self._read_spill())
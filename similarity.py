@@ -0,0 +1,153 @@
+import random
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from catalog import SongCatalog
+
+# Exact-match features compared on the catalog's interned codes: name -> weight
+MATCH_WEIGHTS = {
+    "artist": 1.0,
+    "album": 0.5,
+    "genre": 0.8,
+}
+
+# Dense features stored in the feature matrix: name -> (dimensions, weight)
+DENSE_BLOCKS = {
+    "year": (2, 0.6),
+    "bpm": (2, 0.5),
+    "playlists": (12, 0.8),
+}
+
+
+def hashed_vectors(values: List[str], dims: int) -> np.ndarray:
+    """Signed feature hashing: each string maps to two +/-1 slots of a dims-wide vector"""
+    vectors = np.zeros((len(values), dims), dtype=np.float32)
+    for i, value in enumerate(values):
+        h = zlib.crc32(value.lower().encode("utf-8"))
+        for slot in (h, h >> 12):
+            vectors[i, slot % dims] += 1.0 if (slot >> 8) & 1 else -1.0
+    return vectors
+
+
+def angle_vectors(values: np.ndarray, origin: float, span: float) -> np.ndarray:
+    """Encode a scalar as a unit 2-vector so values `span` apart are orthogonal (0 = missing)"""
+    theta = (values.astype(np.float32) - origin) / span * (np.pi / 2)
+    vectors = np.stack([np.cos(theta), np.sin(theta)], axis=1).astype(np.float32)
+    vectors[values <= 0] = 0.0
+    return vectors
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class SimilarityIndex:
+    """Precomputed song features for nearest-neighbour lookups.
+
+    The score of a song against a seed is the weighted count of exact artist/album/genre
+    matches (compared on interned codes, so there are no hash collisions) plus dot products
+    of small dense blocks encoding era, tempo and playlist co-occurrence. Playlist vectors
+    are only stored for songs that appear in a playlist.
+    """
+
+    def __init__(self, catalog: SongCatalog, playlists: Optional[Iterable[List[str]]] = None):
+        self.catalog = catalog
+        self.row_of: Dict[str, int] = {song_id: row for row, song_id in enumerate(catalog.ids)}
+        self.codes = {name: catalog.columns[name] for name in MATCH_WEIGHTS}
+
+        # Blocks are scaled by sqrt(weight) so a dot product contributes weight * cosine
+        _, year_weight = DENSE_BLOCKS["year"]
+        _, bpm_weight = DENSE_BLOCKS["bpm"]
+        self.matrix = np.ascontiguousarray(np.hstack([
+            angle_vectors(catalog.columns["year"], 1950, 40) * np.sqrt(year_weight),
+            angle_vectors(catalog.columns["bpm"], 60, 60) * np.sqrt(bpm_weight),
+        ]), dtype=np.float32)
+
+        # Songs that share playlists share the playlists' hashed components
+        dims, weight = DENSE_BLOCKS["playlists"]
+        vectors: Dict[int, np.ndarray] = {}
+        for index, song_ids in enumerate(playlists or []):
+            component = hashed_vectors([f"playlist-{index}"], dims)[0]
+            for song_id in song_ids:
+                row = self.row_of.get(song_id)
+                if row is not None:
+                    vectors[row] = vectors.get(row, 0) + component
+        self.playlist_rows = np.array(sorted(vectors), dtype=np.int64)
+        self.playlist_slot = np.full(len(catalog), -1, dtype=np.int32)
+        self.playlist_slot[self.playlist_rows] = np.arange(len(self.playlist_rows), dtype=np.int32)
+        self.playlist_matrix = np.zeros((len(self.playlist_rows), dims), dtype=np.float32)
+        if len(self.playlist_rows):
+            self.playlist_matrix[:] = normalize_rows(np.array([vectors[row] for row in self.playlist_rows]))
+            self.playlist_matrix *= np.sqrt(weight)
+
+    def playlist_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """Playlist block for the given rows (zero for songs in no playlist)"""
+        slots = self.playlist_slot[rows]
+        vectors = np.zeros((len(rows), self.playlist_matrix.shape[1]), dtype=np.float32)
+        present = slots >= 0
+        vectors[present] = self.playlist_matrix[slots[present]]
+        return vectors
+
+    def scores(self, seeds: List[int], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Similarity of every row (or of `rows`) to each seed, as a (rows x seeds) matrix"""
+        seeds = np.asarray(seeds, dtype=np.int64)
+        seed_playlists = self.playlist_vectors(seeds)
+        if rows is None:
+            scores = self.matrix @ self.matrix[seeds].T
+            if len(self.playlist_rows):
+                scores[self.playlist_rows] += self.playlist_matrix @ seed_playlists.T
+        else:
+            scores = self.matrix[rows] @ self.matrix[seeds].T
+            scores += self.playlist_vectors(rows) @ seed_playlists.T
+        for name, weight in MATCH_WEIGHTS.items():
+            codes = self.codes[name] if rows is None else self.codes[name][rows]
+            scores += (codes[:, None] == self.codes[name][seeds][None, :]) * np.float32(weight)
+        return scores
+
+    def similar(self, song_id: str, count: int = 10) -> List[int]:
+        """Rows of the `count` songs most similar to song_id, best first"""
+        return self.similar_batch([song_id], count)[0]
+
+    def similar_batch(self, song_ids: List[str], count: int = 10) -> List[List[int]]:
+        """Top-k neighbours for several seeds with a single matrix product"""
+        seeds = [self.row_of[song_id] for song_id in song_ids]
+        # One contiguous row of scores per seed
+        scores = np.ascontiguousarray(self.scores(seeds).T)
+        count = min(count, len(self.catalog) - 1)
+        results = []
+        for column, seed in enumerate(seeds):
+            if count <= 0:
+                results.append([])
+                continue
+            column_scores = scores[column]
+            column_scores[seed] = -np.inf
+            top = np.argpartition(column_scores, len(column_scores) - count)[-count:]
+            results.append(top[np.argsort(-column_scores[top])].tolist())
+        return results
+
+    def smart_shuffle(self, song_id: str, count: int = 20, variety: int = 3) -> List[int]:
+        """Order a queue that drifts smoothly away from the seed song.
+
+        Candidates are the seed's nearest neighbours; each next song is picked at random
+        among the `variety` candidates closest to the previous one.
+        """
+        seed = self.row_of[song_id]
+        candidates = np.array([seed] + self.similar(song_id, count * 4), dtype=np.int64)
+        pairwise = self.scores(candidates.tolist(), candidates)
+
+        order = [0]
+        remaining = set(range(1, len(candidates)))
+        while remaining and len(order) < count:
+            scores = pairwise[:, order[-1]]
+            nearest = sorted(remaining, key=lambda i: -scores[i])[:variety]
+            choice = random.choice(nearest)
+            order.append(choice)
+            remaining.discard(choice)
+        return candidates[order].tolist()
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + self.playlist_matrix.nbytes + self.playlist_slot.nbytes + self.playlist_rows.nbytes
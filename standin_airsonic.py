@@ -0,0 +1,247 @@
+"""Local stand-in for an Airsonic server, for load tests and traffic replay.
+
+    python standin_airsonic.py [--port 4041] [--songs 5000] [--latency-ms 20] [--jitter-ms 10]
+
+Serves a synthetic, deterministic library over the Subsonic endpoints this server uses
+(search3, getSong, getAlbum, getArtist, getAlbumList, getRandomSongs, getPlaylists,
+getPlaylist, scrobble, stream, hls.m3u8). Any credentials are accepted, and any numeric
+id resolves to a song, album or playlist, so logs recorded against a real library
+replay without 'not found' errors. Every request is delayed by latency-ms plus up to
+jitter-ms, so caching and fan-out behave as they would against a remote server.
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+from xml.sax.saxutils import quoteattr
+
+SONGS_PER_ALBUM = 12
+ALBUMS_PER_ARTIST = 4
+GENRES = ("Rock", "Jazz", "Electronic", "Hip-Hop", "Classical", "Folk", "Pop", "Metal")
+
+
+class Library:
+    """Synthetic library: song n belongs to album n // 12, album a to artist a // 4"""
+
+    def __init__(self, songs: int, playlists: int = 20):
+        self.size = songs
+        self.playlist_count = playlists
+
+    def song(self, n: int) -> Dict:
+        album = n // SONGS_PER_ALBUM
+        artist = album // ALBUMS_PER_ARTIST
+        return {
+            "id": str(n), "parent": str(album), "title": f"Song {n}", "album": f"Album {album}",
+            "artist": f"Artist {artist}", "albumId": str(album), "artistId": str(artist),
+            "track": str(n % SONGS_PER_ALBUM + 1), "discNumber": "1", "year": str(1960 + artist % 60),
+            "genre": GENRES[artist % len(GENRES)], "duration": str(150 + n * 37 % 240),
+            "bitRate": "320", "bpm": str(70 + n * 13 % 100), "playCount": str(n * 7 % 50),
+            "suffix": "mp3", "contentType": "audio/mpeg", "isDir": "false", "type": "music",
+        }
+
+    def album_songs(self, album: int) -> List[Dict]:
+        first = album * SONGS_PER_ALBUM
+        return [self.song(n) for n in range(first, first + SONGS_PER_ALBUM)]
+
+    def album(self, album: int) -> Dict:
+        artist = album // ALBUMS_PER_ARTIST
+        return {
+            "id": str(album), "name": f"Album {album}", "artist": f"Artist {artist}",
+            "artistId": str(artist), "year": str(1960 + artist % 60),
+            "songCount": str(SONGS_PER_ALBUM), "duration": str(SONGS_PER_ALBUM * 270),
+        }
+
+    def artist(self, artist: int) -> Dict:
+        return {"id": str(artist), "name": f"Artist {artist}", "albumCount": str(ALBUMS_PER_ARTIST)}
+
+    def playlist_songs(self, playlist: int) -> List[Dict]:
+        count = 25 + playlist * 37 % 400
+        return [self.song((playlist * 7919 + i * 104729) % self.size) for i in range(count)]
+
+    def playlist(self, playlist: int) -> Dict:
+        return {
+            "id": str(playlist), "name": f"Playlist {playlist}", "owner": "standin", "public": "true",
+            "songCount": str(len(self.playlist_songs(playlist))), "changed": "2024-01-01T00:00:00.000Z",
+        }
+
+
+def element(tag: str, attributes: Dict, children: str = "") -> str:
+    attrs = "".join(f" {k}={quoteattr(v)}" for k, v in attributes.items())
+    return f"<{tag}{attrs}>{children}</{tag}>" if children else f"<{tag}{attrs}/>"
+
+
+def document(body: str = "", status: str = "ok") -> bytes:
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<subsonic-response xmlns="http://subsonic.org/restapi" '
+            f'status="{status}" version="1.15.0">{body}</subsonic-response>').encode()
+
+
+def number(value: str, modulo: int) -> int:
+    """Any id maps into the library (recorded ids come from a different one)"""
+    return int(value) % modulo if value.isdigit() else sum(map(ord, value)) % modulo
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    library: Library
+    latency: float = 0.0
+    jitter: float = 0.0
+    stream_bytes: int = 512 * 1024
+    segment_bytes: int = 64 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        # stream.view -> api_stream, hls.m3u8 -> api_hls
+        endpoint = url.path.rsplit("/", 1)[-1].split(".")[0]
+        time.sleep(self.latency + random.random() * self.jitter)
+
+        handler = getattr(self, f"api_{endpoint}", None)
+        if handler is None:
+            self.send_error(404, f"Unknown endpoint {endpoint}")
+            return
+        try:
+            handler(params)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def reply(self, body: bytes, content_type: str = "text/xml; charset=UTF-8"):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def reply_songs(self, tag: str, songs: List[Dict], container: str = ""):
+        inner = "".join(element(tag, song) for song in songs)
+        self.reply(document(f"<{container}>{inner}</{container}>" if container else inner))
+
+    def api_ping(self, params):
+        self.reply(document())
+
+    def api_scrobble(self, params):
+        self.reply(document())
+
+    def api_getSong(self, params):
+        self.reply(document(element("song", self.library.song(number(params.get("id", "0"), self.library.size)))))
+
+    def api_getRandomSongs(self, params):
+        size = min(int(params.get("size", 10)), 500)
+        picks = random.sample(range(self.library.size), min(size, self.library.size))
+        self.reply_songs("song", [self.library.song(n) for n in picks], "randomSongs")
+
+    def api_getNewestSongs(self, params):
+        size = min(int(params.get("size", 10)), 500)
+        newest = range(self.library.size - 1, max(-1, self.library.size - 1 - size), -1)
+        self.reply_songs("song", [self.library.song(n) for n in newest], "newestSongs")
+
+    def api_search3(self, params):
+        query = params.get("query", "").strip('"').lower()
+        song_count = int(params.get("songCount", 20))
+        offset = int(params.get("songOffset", 0))
+        albums = self.library.size // SONGS_PER_ALBUM + 1
+        artists = albums // ALBUMS_PER_ARTIST + 1
+
+        if query:
+            songs = [n for n in range(self.library.size)
+                     if query in f"song {n}" or query in f"artist {n // SONGS_PER_ALBUM // ALBUMS_PER_ARTIST}"]
+        else:
+            songs = range(self.library.size)
+        songs = songs[offset:offset + song_count]
+        matching_artists = [a for a in range(artists) if query and query in f"artist {a}"]
+        matching_albums = [a for a in range(albums) if query and query in f"album {a}"]
+
+        body = "".join(element("artist", self.library.artist(a))
+                       for a in matching_artists[:int(params.get("artistCount", 20))])
+        body += "".join(element("album", self.library.album(a))
+                        for a in matching_albums[:int(params.get("albumCount", 20))])
+        body += "".join(element("song", self.library.song(n)) for n in songs)
+        self.reply(document(f"<searchResult3>{body}</searchResult3>"))
+
+    def api_getAlbum(self, params):
+        album = number(params.get("id", "0"), self.library.size // SONGS_PER_ALBUM + 1)
+        songs = "".join(element("song", song) for song in self.library.album_songs(album))
+        self.reply(document(element("album", self.library.album(album), songs)))
+
+    def api_getAlbumList(self, params):
+        size = min(int(params.get("size", 10)), 500)
+        albums = random.sample(range(self.library.size // SONGS_PER_ALBUM + 1),
+                               min(size, self.library.size // SONGS_PER_ALBUM + 1))
+        body = "".join(element("album", dict(self.library.album(a), title=f"Album {a}", isDir="true"))
+                       for a in albums)
+        self.reply(document(f"<albumList>{body}</albumList>"))
+
+    def api_getArtist(self, params):
+        artist = number(params.get("id", "0"), self.library.size // SONGS_PER_ALBUM // ALBUMS_PER_ARTIST + 1)
+        first = artist * ALBUMS_PER_ARTIST
+        albums = "".join(element("album", self.library.album(a)) for a in range(first, first + ALBUMS_PER_ARTIST))
+        self.reply(document(element("artist", self.library.artist(artist), albums)))
+
+    def api_getPlaylists(self, params):
+        body = "".join(element("playlist", self.library.playlist(p)) for p in range(1, self.library.playlist_count + 1))
+        self.reply(document(f"<playlists>{body}</playlists>"))
+
+    def api_getPlaylist(self, params):
+        playlist = number(params.get("id", "1"), self.library.playlist_count) or self.library.playlist_count
+        entries = "".join(element("entry", song) for song in self.library.playlist_songs(playlist))
+        self.reply(document(element("playlist", self.library.playlist(playlist), entries)))
+
+    def api_stream(self, params):
+        # Scale the body with the requested bitrate so ABR decisions change the byte count
+        bitrate = int(params.get("maxBitRate") or 320)
+        self.reply(bytes(self.stream_bytes * min(bitrate, 320) // 320), "audio/mpeg")
+
+    def api_hls(self, params):
+        # Relative segment URIs, resolved against this playlist's URL by the proxy
+        song = params.get("id", "0")
+        bitrate = params.get("bitRate", "320")
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:10", "#EXT-X-MEDIA-SEQUENCE:0"]
+        for index in range(18):
+            lines += ["#EXTINF:10.0,", f"segment.view?id={song}&bitRate={bitrate}&index={index}"]
+        lines.append("#EXT-X-ENDLIST")
+        self.reply("\n".join(lines).encode(), "application/vnd.apple.mpegurl")
+
+    def api_segment(self, params):
+        self.reply(bytes(self.segment_bytes), "video/MP2T")
+
+
+def serve(port: int, songs: int, latency_ms: float = 20, jitter_ms: float = 10,
+          stream_kb: int = 512, segment_kb: int = 64) -> ThreadingHTTPServer:
+    """Start the stand-in on a background thread and return the server (call shutdown() to stop)"""
+    handler = type("Handler", (StandinHandler,), {
+        "library": Library(songs),
+        "latency": latency_ms / 1000,
+        "jitter": jitter_ms / 1000,
+        "stream_bytes": stream_kb * 1024,
+        "segment_bytes": segment_kb * 1024,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="standin-airsonic", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=4041)
+    parser.add_argument("--songs", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--stream-kb", type=int, default=512)
+    parser.add_argument("--segment-kb", type=int, default=64)
+    args = parser.parse_args()
+
+    server = serve(args.port, args.songs, args.latency_ms, args.jitter_ms, args.stream_kb, args.segment_kb)
+    print(f"Stand-in Airsonic with {args.songs} songs on http://127.0.0.1:{args.port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""MCP server over stdio for local clients (newline-delimited JSON-RPC 2.0).
+
+    python stdio_server.py
+
+Serves the same tools as the HTTP server without importing FastAPI or uvicorn;
+requests and numpy are only loaded when a tool first needs them, so a client gets
+its tools/list answer quickly (see bench_stdio.py).
+"""
+import contextvars
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from models import negotiate_protocol_version
+from progress import current_progress
+from toolAirsonic import list_tools, prepare_tool_call, tool_registry
+
+
+class StdioServer:
+    """Reads JSON-RPC messages from stdin and writes responses to stdout.
+
+    Tool calls run on a small thread pool, so a quick playback control is not stuck
+    behind a library crawl; responses may therefore arrive out of order (matched by id).
+    """
+
+    def __init__(self, stdin, stdout, workers: int = 4):
+        self.stdin = stdin
+        self.stdout = stdout
+        self.write_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="tool")
+
+    def send(self, message: dict):
+        line = json.dumps(message)
+        with self.write_lock:
+            self.stdout.write(line + "\n")
+            self.stdout.flush()
+
+    def error(self, request_id, code: int, message: str):
+        self.send({"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}})
+
+    def serve(self):
+        for line in self.stdin:
+            if not line.strip():
+                continue
+            try:
+                message = json.loads(line)
+            except json.JSONDecodeError:
+                self.error(None, -32700, "Parse error")
+                continue
+            if not isinstance(message, dict) or "method" not in message:
+                continue
+            if "id" not in message:
+                # Notifications (notifications/initialized, cancellations) need no answer
+                continue
+            self.handle(message)
+        self.executor.shutdown(wait=True)
+
+    def handle(self, message: dict):
+        request_id = message["id"]
+        method = message["method"]
+        params = message.get("params") or {}
+
+        if method == "initialize":
+            self.send({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {
+                    "protocolVersion": negotiate_protocol_version(params.get("protocolVersion")),
+                    "capabilities": {
+                        "tools": {}
+                    },
+                    "serverInfo": {
+                        "name": "airsonic-mcp",
+                        "version": "1.0.0"
+                    }
+                }
+            })
+        elif method == "ping":
+            self.send({"jsonrpc": "2.0", "id": request_id, "result": {}})
+        elif method == "tools/list":
+            self.send({"jsonrpc": "2.0", "id": request_id, "result": {"tools": list_tools()}})
+        elif method == "tools/call":
+            self.call_tool(request_id, params)
+        else:
+            self.error(request_id, -32601, f"Method {method} not found")
+
+    def call_tool(self, request_id, params: dict):
+        tool_name = params.get("name")
+        if tool_name not in tool_registry:
+            self.error(request_id, -32601, f"Tool {tool_name} not found")
+            return
+
+        tool_call = prepare_tool_call(tool_name, params.get("arguments", {}))
+        progress_token = (params.get("_meta") or {}).get("progressToken")
+
+        def report(progress, total, message):
+            notification = {"progressToken": progress_token, "progress": progress}
+            if total is not None:
+                notification["total"] = total
+            if message:
+                notification["message"] = message
+            self.send({"jsonrpc": "2.0", "method": "notifications/progress", "params": notification})
+
+        def run():
+            if progress_token is not None:
+                current_progress.set(report)
+            try:
+                result = tool_call()
+            except Exception as e:
+                self.error(request_id, -32603, f"Error executing tool: {str(e)}")
+                return
+            self.send({
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "result": {
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": str(result)
+                        }
+                    ]
+                }
+            })
+
+        self.executor.submit(contextvars.copy_context().run, run)
+
+
+def main():
+    # config.json and theme/ live next to this file, whatever directory the client starts us in
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    stdout = sys.stdout
+    # Anything printed by tools must not corrupt the protocol stream
+    sys.stdout = sys.stderr
+    StdioServer(sys.stdin, stdout).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+# Bitrates (kbps) the proxy asks Airsonic to transcode to
+BITRATE_LADDER = [64, 96, 128, 192, 256, 320]
+
+# Fraction of the measured throughput a stream may use
+HEADROOM = 0.7
+
+# Only the start of a stream is measured: once the player's buffer is full it reads
+# at playback speed, which says nothing about the link
+PROBE_BYTES = 1024 * 1024
+MIN_PROBE_SECONDS = 0.2
+
+
+class ThroughputEstimator:
+    """Per-client moving average of how fast clients drain proxied streams (kbps)"""
+
+    def __init__(self, smoothing: float = 0.5):
+        self.smoothing = smoothing
+        self.estimates: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def record(self, client: str, nbytes: int, seconds: float) -> Optional[float]:
+        if seconds < MIN_PROBE_SECONDS or nbytes <= 0:
+            return self.estimate(client)
+        kbps = nbytes * 8 / 1000 / seconds
+        with self.lock:
+            previous = self.estimates.get(client)
+            if previous is not None:
+                kbps = self.smoothing * kbps + (1 - self.smoothing) * previous
+            self.estimates[client] = kbps
+        return kbps
+
+    def estimate(self, client: str) -> Optional[float]:
+        with self.lock:
+            return self.estimates.get(client)
+
+
+def choose_bitrate(throughput_kbps: Optional[float], cap: Optional[int] = None) -> Optional[int]:
+    """Highest ladder bitrate that fits the throughput and cap (None = original file)"""
+    if throughput_kbps is None:
+        return cap
+    target = throughput_kbps * HEADROOM
+    if cap:
+        target = min(target, cap)
+    fitting = [rate for rate in BITRATE_LADDER if rate <= target]
+    chosen = fitting[-1] if fitting else BITRATE_LADDER[0]
+    # Fast links without a cap get the original file
+    if cap is None and chosen == BITRATE_LADDER[-1]:
+        return None
+    return chosen
+
+
+def clamp_bitrate(bitrate: int) -> int:
+    """Highest ladder bitrate at or below bitrate (the lowest one for anything smaller)"""
+    fitting = [rate for rate in BITRATE_LADDER if rate <= bitrate]
+    return fitting[-1] if fitting else BITRATE_LADDER[0]
+
+
+def measure_stream(chunks, on_measured, on_finished=None, probe_bytes: int = PROBE_BYTES):
+    """Yield chunks unchanged, calling on_measured(bytes, seconds) once probe_bytes are read.
+
+    on_measured is not called for streams that end before filling the window. HLS
+    segments pass their own size, so each segment fetch is one sample.
+
+    on_finished(bytes, first_chunk_seconds) is called when the stream ends or the client
+    disconnects, with the total bytes sent and the time until the first chunk was ready.
+    """
+    started = time.monotonic()
+    first_chunk_seconds = None
+    sent = 0
+    measured = False
+    try:
+        for chunk in chunks:
+            if first_chunk_seconds is None:
+                first_chunk_seconds = time.monotonic() - started
+            yield chunk
+            sent += len(chunk)
+            if not measured and sent >= probe_bytes:
+                measured = True
+                on_measured(sent, time.monotonic() - started)
+        # Streams shorter than the probe window are not measured: their elapsed time
+        # is mostly the player pacing its reads, not the link
+    finally:
+        if on_finished:
+            on_finished(sent, first_chunk_seconds)
+
+
+def chunked(data: bytes, size: int = 64 * 1024):
+    """Split a body into chunks, so sending it can be timed chunk by chunk"""
+    view = memoryview(data)
+    for start in range(0, len(data), size):
+        yield bytes(view[start:start + size])
+
+
+class SegmentCache:
+    """Thread-safe LRU cache of stream segments, bounded by total bytes"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: "OrderedDict[Tuple, bytes]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        with self.lock:
+            data = self.entries.get(key)
+            if data is not None:
+                self.entries.move_to_end(key)
+            return data
+
+    def put(self, key: Tuple, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+def rewrite_playlist(text: str, base_url: str, segment_path: str) -> Tuple[str, List[str]]:
+    """Rewrite an upstream HLS media playlist to serve segments from segment_path.
+
+    Returns the rewritten playlist, where the n-th segment URI becomes
+    f"{segment_path}/{n}.ts", and the absolute upstream URL of each segment.
+    """
+    lines = []
+    upstream_urls = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith("#"):
+            upstream_urls.append(urljoin(base_url, stripped))
+            line = f"{segment_path}/{len(upstream_urls) - 1}.ts"
+        lines.append(line)
+    return "\n".join(lines) + "\n", upstream_urls
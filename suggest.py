@@ -0,0 +1,145 @@
+import re
+import sys
+import unicodedata
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from catalog import SongCatalog
+
+# Offsets are sorted on this many characters; longer queries are verified after lookup
+KEY_CHARS = 32
+
+# Candidates ranked per lookup (several words of one string can match the same prefix)
+CANDIDATES_PER_RESULT = 4
+
+WORD_START = re.compile(r"\b\w")
+
+
+def normalize(text: str) -> str:
+    """Case- and accent-insensitive form used for matching ("Beyoncé" -> "beyonce")"""
+    if text.isascii():
+        return text.lower().replace("\n", " ")
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).replace("\n", " ")
+
+
+class PrefixIndex:
+    """Prefix lookups over a list of strings, matching at the start of any word.
+
+    All strings are normalized and joined into one text. The index is the array of
+    word-start offsets into that text, sorted by the text that follows them, so the
+    entries for a prefix form one contiguous range found by binary search. "dark si"
+    matches "The Dark Side of the Moon". Each offset also stores its string and a
+    precomputed rank: matches at the start of the string first, then higher weight,
+    then shorter strings.
+    """
+
+    def __init__(self, strings: List[str], weights: Optional[np.ndarray] = None):
+        normalized = [normalize(s) for s in strings]
+        self.text = "\n".join(normalized) + "\n"
+        lengths = np.array([len(s) for s in normalized], dtype=np.int64)
+        starts = np.zeros(len(normalized), dtype=np.int64)
+        if len(normalized):
+            starts[1:] = np.cumsum(lengths + 1)[:-1]
+
+        text = self.text
+        offsets = [match.start() for match in WORD_START.finditer(text)]
+        offsets.sort(key=lambda offset: text[offset:offset + KEY_CHARS])
+        offsets = np.array(offsets, dtype=np.int64)
+
+        owners = np.searchsorted(starts, offsets, side="right") - 1
+        if weights is None:
+            weights = np.zeros(len(normalized))
+        weight = np.clip(np.asarray(weights, dtype=np.float64), 0, 2 ** 24 - 1).astype(np.int64)[owners]
+        at_start = (offsets == starts[owners]).astype(np.int64)
+        rank = (at_start << 40) | (weight << 16) | (0xFFFF - np.minimum(lengths[owners], 0xFFFF))
+
+        self.offsets = offsets.astype(np.int32)
+        self.owners = owners.astype(np.int32)
+        self.rank = rank
+
+    def _bound(self, prefix: str, upper: bool) -> int:
+        """First position whose key is >= prefix (> prefix when upper)"""
+        text, offsets, n = self.text, self.offsets, len(prefix)
+        lo, hi = 0, len(offsets)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = int(offsets[mid])
+            key = text[start:start + n]
+            if key < prefix or (upper and key == prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def search(self, query: str, limit: int = 5) -> List[int]:
+        """Indices of the best strings with a word starting with query"""
+        prefix = " ".join(normalize(query).split())
+        if not prefix or limit <= 0:
+            return []
+        key = prefix[:KEY_CHARS]
+        lo = self._bound(key, upper=False)
+        hi = self._bound(key, upper=True)
+        if lo == hi:
+            return []
+
+        positions = np.arange(lo, hi)
+        if len(prefix) > KEY_CHARS:
+            positions = positions[[self.text.startswith(prefix, int(self.offsets[p])) for p in positions]]
+        rank = self.rank[positions]
+        wanted = limit * CANDIDATES_PER_RESULT
+        if len(positions) > wanted:
+            top = np.argpartition(-rank, wanted - 1)[:wanted]
+            positions, rank = positions[top], rank[top]
+        owners = self.owners[positions[np.argsort(-rank, kind="stable")]]
+
+        results, seen = [], set()
+        for owner in owners.tolist():
+            if owner not in seen:
+                seen.add(owner)
+                results.append(owner)
+                if len(results) == limit:
+                    break
+        return results
+
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.text) + self.offsets.nbytes + self.owners.nbytes + self.rank.nbytes
+
+
+class SuggestIndex:
+    """As-you-type suggestions over a catalog's song titles, artists and albums"""
+
+    def __init__(self, catalog: SongCatalog):
+        self.catalog = catalog
+        plays = catalog.columns["play_count"]
+        self.songs = PrefixIndex(list(catalog.titles), plays)
+        self.pool_indexes = {}
+        for name in ("artist", "album"):
+            values = catalog.pools[name].values
+            # Rank artists and albums by how much their songs are played
+            totals = np.bincount(catalog.columns[name], weights=plays, minlength=len(values))
+            counts = np.bincount(catalog.columns[name], minlength=len(values))
+            self.pool_indexes[name] = (PrefixIndex(values, totals + counts), counts)
+
+    def suggest(self, query: str, limit: int = 5) -> Dict[str, List[Dict]]:
+        catalog = self.catalog
+        songs = []
+        for row in self.songs.search(query, limit):
+            songs.append({
+                "id": catalog.ids[row],
+                "title": catalog.titles[row],
+                "artist": catalog.pools["artist"].values[catalog.columns["artist"][row]],
+                "album": catalog.pools["album"].values[catalog.columns["album"][row]],
+            })
+        result = {"songs": songs}
+        for name, (index, counts) in self.pool_indexes.items():
+            values = catalog.pools[name].values
+            result[f"{name}s"] = [
+                {"name": values[code], "songs": int(counts[code])}
+                for code in index.search(query, limit)
+            ]
+        return result
+
+    def nbytes(self) -> int:
+        return self.songs.nbytes() + sum(index.nbytes() + counts.nbytes for index, counts in self.pool_indexes.values())
@@ -4,6 +4,10 @@ let currentStreamUrl = null;
 let isSeeking = false;
 let isMuted = false;
 let savedVolume = 100;
+let hls = null;
+let loadedSource = null;
+let streamOffset = 0;  // Position (s) the current stream starts at after a server-side seek
+let songDuration = 0;
 
 const audioPlayer = document.getElementById('audioPlayer');
 const seekSlider = document.getElementById('seekSlider');
@@ -16,11 +20,9 @@ audioPlayer.volume = 1.0;
 
 // Update time display and seek slider
 audioPlayer.addEventListener('timeupdate', updateTimeDisplay);
-audioPlayer.addEventListener('loadedmetadata', function() {
-    seekSlider.max = audioPlayer.duration || 100;
-});
-audioPlayer.addEventListener('durationchange', function() {
-    seekSlider.max = audioPlayer.duration || 100;
+// Scrobble the finished song and advance through the queue (smart shuffle)
+audioPlayer.addEventListener('ended', function() {
+    controlPlayback('ended');
 });
 
 // Poll for playback state updates
@@ -33,20 +35,55 @@ function formatTime(seconds) {
     return `${mins}:${secs.toString().padStart(2, '0')}`;
 }
 
+function totalDuration() {
+    // Transcoded streams often report no duration, so prefer the song's duration from the server
+    if (songDuration > 0) return songDuration;
+    const duration = audioPlayer.duration;
+    return isFinite(duration) ? streamOffset + duration : 0;
+}
+
 function updateTimeDisplay() {
     if (!isSeeking) {
-        const current = audioPlayer.currentTime || 0;
-        const duration = audioPlayer.duration || 0;
+        const current = streamOffset + (audioPlayer.currentTime || 0);
+        const duration = totalDuration();
         seekSlider.value = duration > 0 ? (current / duration) * 100 : 0;
         timeDisplay.textContent = `${formatTime(current)} / ${formatTime(duration)}`;
     }
 }
 
+function isBuffered(time) {
+    for (let i = 0; i < audioPlayer.buffered.length; i++) {
+        if (time >= audioPlayer.buffered.start(i) && time <= audioPlayer.buffered.end(i)) {
+            return true;
+        }
+    }
+    return false;
+}
+
+function seekToPosition(target, seekUrl) {
+    const local = target - streamOffset;
+    const playingHls = hls || loadedSource !== currentStreamUrl;
+    if (playingHls || (local >= 0 && isBuffered(local)) || !seekUrl) {
+        // HLS seeks per segment and buffered audio can be seeked in place
+        audioPlayer.currentTime = Math.max(local, 0);
+        return;
+    }
+    // Restart the stream at the target so the server transcodes from there
+    const wasPlaying = !audioPlayer.paused;
+    streamOffset = target;
+    audioPlayer.src = new URL(seekUrl, API_BASE).href;
+    audioPlayer.load();
+    if (wasPlaying) {
+        audioPlayer.play();
+    }
+}
+
 function seekTo(value) {
     isSeeking = true;
-    const duration = audioPlayer.duration || 0;
-    if (duration > 0) {
-        audioPlayer.currentTime = (value / 100) * duration;
+    const duration = totalDuration();
+    if (duration > 0 && currentSongId) {
+        const target = Math.floor((value / 100) * duration);
+        seekToPosition(target, `/stream/${currentSongId}?timeOffset=${target}`);
     }
     setTimeout(() => { isSeeking = false; }, 100);
 }
@@ -102,6 +139,34 @@ function switchTab(tabName) {
     }
 }
 
+function loadSource(streamUrl, hlsUrl) {
+    if (hls) {
+        hls.destroy();
+        hls = null;
+    }
+    streamOffset = 0;
+    if (hlsUrl && audioPlayer.canPlayType('application/vnd.apple.mpegurl')) {
+        // Native HLS (Safari, iOS)
+        audioPlayer.src = hlsUrl;
+    } else if (hlsUrl && window.Hls && Hls.isSupported()) {
+        hls = new Hls();
+        hls.on(Hls.Events.ERROR, function(event, data) {
+            if (!data.fatal) return;
+            // Recover at segment granularity instead of restarting the song
+            if (data.type === Hls.ErrorTypes.NETWORK_ERROR) {
+                hls.startLoad(audioPlayer.currentTime);
+            } else if (data.type === Hls.ErrorTypes.MEDIA_ERROR) {
+                hls.recoverMediaError();
+            }
+        });
+        hls.loadSource(hlsUrl);
+        hls.attachMedia(audioPlayer);
+    } else {
+        audioPlayer.src = streamUrl;
+        audioPlayer.load();
+    }
+}
+
 async function updatePlaybackState() {
     try {
         const response = await fetch(`${API_BASE}/api/playback/state`);
@@ -112,7 +177,10 @@ async function updatePlaybackState() {
         
         if (state.current_song) {
             currentSongId = state.current_song;
-            currentStreamUrl = state.current_stream_url;
+            // Prefer the proxied stream so the server can adapt the bitrate
+            currentStreamUrl = state.player_stream_url
+                ? new URL(state.player_stream_url, API_BASE).href
+                : state.current_stream_url;
             
             // Update UI
             document.getElementById('playBtn').disabled = false;
@@ -132,17 +200,21 @@ async function updatePlaybackState() {
             }
             
             // Update audio player
-            if (currentStreamUrl && audioPlayer.src !== currentStreamUrl) {
-                audioPlayer.src = currentStreamUrl;
-                audioPlayer.load();
+            const hlsUrl = state.player_hls_url ? new URL(state.player_hls_url, API_BASE).href : null;
+            const source = hlsUrl || currentStreamUrl;
+            if (source && loadedSource !== source) {
+                loadedSource = source;
+                loadSource(currentStreamUrl, hlsUrl);
                 if (state.is_playing) {
                     audioPlayer.play();
                 }
             }
             
+            songDuration = state.duration || 0;
+            
             // Handle seek position
             if (state.seek_position !== null && state.seek_position !== undefined) {
-                audioPlayer.currentTime = state.seek_position;
+                seekToPosition(state.seek_position, state.seek_url);
                 // Clear seek position after applying
                 fetch(`${API_BASE}/api/playback/control`, {
                     method: 'POST',
@@ -174,6 +246,11 @@ async function updatePlaybackState() {
             document.getElementById('playBtn').disabled = true;
             document.getElementById('pauseBtn').disabled = true;
             document.getElementById('stopBtn').disabled = true;
+            if (hls) {
+                hls.destroy();
+                hls = null;
+            }
+            loadedSource = null;
             document.getElementById('audioPlayer').src = '';
         }
     } catch (error) {
@@ -245,6 +322,15 @@ async function controlPlayback(action) {
     }
 }
 
+// A song record from the API as renderSongsList expects it (title and artist escaped)
+function songItem(song) {
+    return {
+        title: escapeHtml(song.title),
+        artist: escapeHtml(song.artist),
+        songId: song.id
+    };
+}
+
 function renderSongsList(songs, containerId) {
     const container = document.getElementById(containerId);
     if (songs.length === 0) {
@@ -255,17 +341,21 @@ function renderSongsList(songs, containerId) {
     let html = '';
     songs.forEach(song => {
         html += `
-            <div class="song-item" onclick="playSong('${song.songId}')">
+            <div class="song-item" data-song-id="${escapeHtml(song.songId)}">
                 <div class="song-item-info">
                     <div class="song-item-title">${song.title}</div>
                     <div class="song-item-artist">${song.artist}</div>
                 </div>
-                <span class="song-item-id">ID: ${song.songId}</span>
+                <span class="song-item-id">ID: ${escapeHtml(song.songId)}</span>
                 <span class="play-icon">▶</span>
             </div>
         `;
     });
     container.innerHTML = html;
+    // Ids are read back from the attribute, so namespaced ids ("home:123") reach play_song unchanged
+    container.querySelectorAll('.song-item[data-song-id]').forEach(item => {
+        item.addEventListener('click', () => playSong(item.dataset.songId));
+    });
 }
 
 async function loadRandomSongs() {
@@ -273,31 +363,10 @@ async function loadRandomSongs() {
     container.innerHTML = '<div class="loading">Loading songs...</div>';
     
     try {
-        const response = await fetch(`${API_BASE}/tools/call`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                name: 'get_random_songs',
-                arguments: { count: 50 }
-            })
-        });
-        
+        const response = await fetch(`${API_BASE}/api/songs/random?count=50`);
         const result = await response.json();
-        if (result.result && result.result.content) {
-            const text = result.result.content[0].text;
-            // Parse songs from text
-            const lines = text.split('\n').filter(line => line.trim() && /^\d+\./.test(line));
-            const songs = [];
-            
-            lines.forEach(line => {
-                const match = line.match(/(\d+)\. (.+?) by (.+?) \(ID: (\d+)\)/);
-                if (match) {
-                    const [, , title, artist, songId] = match;
-                    songs.push({ title, artist, songId });
-                }
-            });
-            
-            renderSongsList(songs, 'browseResults');
+        if (result.songs) {
+            renderSongsList(result.songs.map(songItem), 'browseResults');
         } else {
             container.innerHTML = '<div class="empty-state">No songs found</div>';
         }
@@ -318,31 +387,10 @@ async function searchSongs() {
     container.innerHTML = '<div class="loading">Searching...</div>';
     
     try {
-        const response = await fetch(`${API_BASE}/tools/call`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                name: 'search_songs',
-                arguments: { query }
-            })
-        });
-        
+        const response = await fetch(`${API_BASE}/api/songs/search?q=${encodeURIComponent(query)}`);
         const result = await response.json();
-        if (result.result && result.result.content) {
-            const text = result.result.content[0].text;
-            // Parse songs from text
-            const lines = text.split('\n').filter(line => line.trim() && /^\d+\./.test(line));
-            const songs = [];
-            
-            lines.forEach(line => {
-                const match = line.match(/(\d+)\. (.+?) by (.+?) \(ID: (\d+)\)/);
-                if (match) {
-                    const [, , title, artist, songId] = match;
-                    songs.push({ title, artist, songId });
-                }
-            });
-            
-            renderSongsList(songs, 'searchResults');
+        if (result.songs) {
+            renderSongsList(result.songs.map(songItem), 'searchResults');
         } else {
             container.innerHTML = '<div class="empty-state">No results found</div>';
         }
@@ -372,10 +420,104 @@ async function playSong(songId) {
 
 function handleSearchKeyPress(event) {
     if (event.key === 'Enter') {
+        clearTimeout(suggestTimer);
+        if (suggestController) {
+            suggestController.abort();
+        }
         searchSongs();
     }
 }
 
+// As-you-type suggestions: debounced, and a newer keystroke aborts the pending request
+const SUGGEST_DELAY_MS = 120;
+let suggestTimer = null;
+let suggestController = null;
+
+// Safe in element content and in quoted attribute values
+function escapeHtml(text) {
+    return String(text)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+function handleSearchInput() {
+    clearTimeout(suggestTimer);
+    if (suggestController) {
+        suggestController.abort();
+        suggestController = null;
+    }
+    const query = document.getElementById('searchInput').value.trim();
+    if (!query) {
+        document.getElementById('searchResults').innerHTML = '';
+        return;
+    }
+    suggestTimer = setTimeout(() => fetchSuggestions(query), SUGGEST_DELAY_MS);
+}
+
+async function fetchSuggestions(query) {
+    const controller = new AbortController();
+    suggestController = controller;
+    try {
+        const response = await fetch(`${API_BASE}/api/suggest?q=${encodeURIComponent(query)}&limit=8`, {
+            signal: controller.signal
+        });
+        const suggestions = await response.json();
+        if (!suggestions.error) {
+            renderSuggestions(suggestions);
+        }
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Error fetching suggestions:', error);
+        }
+    } finally {
+        if (suggestController === controller) {
+            suggestController = null;
+        }
+    }
+}
+
+function renderSuggestions(suggestions) {
+    const container = document.getElementById('searchResults');
+    const songs = suggestions.songs.map(song => ({
+        title: escapeHtml(song.title),
+        artist: escapeHtml(`${song.artist} · ${song.album}`),
+        songId: song.id
+    }));
+    renderSongsList(songs, 'searchResults');
+    
+    // Artists and albums fill in the search box and run a full search
+    let html = '';
+    [...suggestions.artists.map(a => ['artist', a]), ...suggestions.albums.map(a => ['album', a])].forEach(([kind, item]) => {
+        html += `
+            <div class="song-item suggestion-item" data-query="${escapeHtml(item.name)}">
+                <div class="song-item-info">
+                    <div class="song-item-title">${escapeHtml(item.name)}</div>
+                    <div class="song-item-artist">${kind} · ${item.songs} songs</div>
+                </div>
+                <span class="play-icon">⌕</span>
+            </div>
+        `;
+    });
+    if (songs.length === 0 && !html) {
+        return;
+    }
+    if (songs.length === 0) {
+        container.innerHTML = '';
+    }
+    container.insertAdjacentHTML('beforeend', html);
+    container.querySelectorAll('.suggestion-item').forEach(item => {
+        item.addEventListener('click', () => {
+            document.getElementById('searchInput').value = item.dataset.query;
+            searchSongs();
+        });
+    });
+}
+
+document.getElementById('searchInput').addEventListener('input', handleSearchInput);
+
 // Initial state update and load random songs
 updatePlaybackState();
 loadRandomSongs();
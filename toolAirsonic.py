@@ -1,10 +1,30 @@
 from models import Tool, ToolParameter
-import requests
+from profiling import span
+from progress import report_progress
+from scrobbler import PartialSubmitError, ScrobbleReporter
+from random_pool import RandomSongPool
+from playlist_cache import PlaylistCache
+from records import Album, Playlist, Song
 import json
+import os
 import xml.etree.ElementTree as ET
 import hashlib
 import base64
-from typing import Dict, Optional
+import threading
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import zip_longest
+import inspect
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+
+# requests and the numpy-based indexes are imported where they are first needed, so
+# loading the tool definitions stays fast (see stdio_server.py)
+if TYPE_CHECKING:
+    from catalog import SongCatalog
+    from similarity import SimilarityIndex
+    from suggest import SuggestIndex
 
 # Global state for playback control
 playback_state = {
@@ -12,16 +32,58 @@ playback_state = {
     "is_playing": False,
     "is_paused": False,
     "current_stream_url": None,
+    "player_stream_url": None,  # Proxied stream used by the web player
+    "player_hls_url": None,  # HLS playlist used by the web player when stream_mode is "hls"
+    "stream_bitrate": None,  # Bitrate (kbps) requested from Airsonic, None = original
+    "measured_throughput_kbps": None,  # Last measured player throughput
+    "last_stream_stats": None,  # Bytes sent and time to audio of the last proxied stream
     "seek_position": None,  # Position in seconds to seek to
+    "seek_url": None,  # Proxied stream restarted at seek_position (server-side seek)
+    "duration": None,  # Duration of the current song in seconds
     "volume": 100,  # Volume percentage (0-100)
-    "is_muted": False  # Mute state
+    "is_muted": False,  # Mute state
+    "queue": [],  # Upcoming song IDs (smart shuffle)
+    "queue_position": None  # Index of the current song in the queue
+}
+
+# Album cache: album_id -> (fetched_at, Album, songs)
+album_cache = {}
+album_cache_lock = threading.Lock()
+
+# Columnar song catalog used by find_songs, loaded lazily
+catalog_state = {
+    "catalog": None,
+    "similarity": None,  # SimilarityIndex built from the current catalog
+    "suggest": None,  # SuggestIndex built from the current catalog
+    "loaded_at": 0,
+    "load_seconds": 0
 }
+catalog_lock = threading.Lock()
+
+# Background build of the suggestion index, so /api/suggest never waits for a crawl
+suggest_warmup = {"thread": None, "error": None}
+suggest_warmup_lock = threading.Lock()
+
+# Random songs handed out by get_random_songs, created on first use
+random_pool_state = {"pool": None}
+random_pool_lock = threading.Lock()
+
+# Parsed playlists per backend (None without federation), created on first use
+playlist_caches: Dict[Optional[str], PlaylistCache] = {}
+playlist_lock = threading.Lock()
+
+# Background reporter for now-playing and completed plays, created on first use
+scrobble_state = {"reporter": None}
+scrobble_lock = threading.Lock()
+
+# Backend that requests go to when several Airsonic servers are federated (None = default)
+current_backend: contextvars.ContextVar = contextvars.ContextVar("current_backend", default=None)
 
 # Load config
 def load_config():
-    """Load Airsonic configuration from config.json"""
+    """Load Airsonic configuration from config.json (or the file named by AIRSONIC_MCP_CONFIG)"""
     try:
-        with open("config.json", "r") as f:
+        with span("config"), open(os.environ.get("AIRSONIC_MCP_CONFIG", "config.json"), "r") as f:
             config = json.load(f)
             return config.get("airsonic", {})
     except FileNotFoundError:
@@ -29,40 +91,91 @@ def load_config():
     except json.JSONDecodeError:
         raise Exception("Invalid config.json format.")
 
+def active_backend() -> Optional[str]:
+    """Name of the backend requests currently go to (None without federation)"""
+    backends = load_config().get("backends") or {}
+    return current_backend.get() or next(iter(backends), None)
+
+def backend_config() -> Dict:
+    """Config of the active backend: its `backends` entry layered over the top-level settings"""
+    config = load_config()
+    backends = config.get("backends") or {}
+    name = current_backend.get() or next(iter(backends), None)
+    if name is None:
+        return config
+    if name not in backends:
+        raise Exception(f"Unknown backend '{name}'")
+    return {**config, **backends[name]}
+
+def public_id(item_id: str) -> str:
+    """Namespace an Airsonic id with the active backend ("home:123") when federating"""
+    backend = active_backend()
+    return f"{backend}:{item_id}" if backend and item_id is not None else item_id
+
+def split_id(item_id: str) -> Tuple[Optional[str], str]:
+    """Split a namespaced id into (backend, Airsonic id); plain ids belong to the default backend"""
+    backends = load_config().get("backends") or {}
+    name, separator, raw_id = str(item_id).partition(":")
+    if separator and name in backends:
+        return name, raw_id
+    return None, item_id
+
+@contextmanager
+def use_backend(name: Optional[str]):
+    """Send requests made inside the block to the named backend"""
+    if name is None:
+        yield
+        return
+    token = current_backend.set(name)
+    try:
+        yield
+    finally:
+        current_backend.reset(token)
+
+@contextmanager
+def routed(item_id: str):
+    """Route requests inside the block to item_id's backend, yielding the backend's own id"""
+    backend, raw_id = split_id(item_id)
+    with use_backend(backend):
+        yield raw_id
+
 def get_airsonic_auth_params():
     """Generate Airsonic authentication parameters"""
-    config = load_config()
-    username = config.get("username")
-    password = config.get("password")
-    api_version = config.get("api_version", "1.15.0")
-    use_token_auth = config.get("use_token_auth", True)
-    
-    if use_token_auth:
-        # Airsonic uses token-based auth: salt + md5(password + salt)
-        import random
-        import string
-        salt = ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
-        token = hashlib.md5((password + salt).encode()).hexdigest()
-        
-        return {
-            "u": username,
-            "t": token,
-            "s": salt,
-            "v": api_version,
-            "c": "airsonic-mcp"
-        }
-    else:
-        # Fallback to password-based auth (less secure)
-        return {
-            "u": username,
-            "p": password,
-            "v": api_version,
-            "c": "airsonic-mcp"
-        }
+    with span("auth"):
+        config = backend_config()
+        username = config.get("username")
+        password = config.get("password")
+        api_version = config.get("api_version", "1.15.0")
+        use_token_auth = config.get("use_token_auth", True)
+        
+        if use_token_auth:
+            # Airsonic uses token-based auth: salt + md5(password + salt)
+            import random
+            import string
+            salt = ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
+            token = hashlib.md5((password + salt).encode()).hexdigest()
+        
+            return {
+                "u": username,
+                "t": token,
+                "s": salt,
+                "v": api_version,
+                "c": "airsonic-mcp"
+            }
+        else:
+            # Fallback to password-based auth (less secure)
+            return {
+                "u": username,
+                "p": password,
+                "v": api_version,
+                "c": "airsonic-mcp"
+            }
 
 def make_airsonic_request(endpoint: str, params: Optional[Dict] = None):
     """Make a request to Airsonic API"""
-    config = load_config()
+    import requests
+    
+    config = backend_config()
     server_url = config.get("server_url", "http://localhost:4040")
     
     auth_params = get_airsonic_auth_params()
@@ -71,7 +184,8 @@ def make_airsonic_request(endpoint: str, params: Optional[Dict] = None):
     
     url = f"{server_url}/rest/{endpoint}"
     try:
-        response = requests.get(url, params=auth_params, timeout=10)
+        with span("upstream"):
+            response = requests.get(url, params=auth_params, timeout=10)
         response.raise_for_status()
         return response
     except requests.exceptions.RequestException as e:
@@ -79,89 +193,435 @@ def make_airsonic_request(endpoint: str, params: Optional[Dict] = None):
 
 def parse_xml_response(response):
     """Parse XML response from Airsonic"""
+    with span("parse"):
+        try:
+            # Remove namespaces from XML to simplify parsing
+            content = response.content
+            if isinstance(content, bytes):
+                content = content.decode('utf-8')
+            # Remove namespace declarations
+            content = content.replace('xmlns="http://subsonic.org/restapi"', '')
+            root = ET.fromstring(content)
+            # Check for errors in response
+            status = root.get("status")
+            if status == "failed":
+                error = root.find(".//error")
+                if error is not None:
+                    error_msg = error.get("message", "Unknown error")
+                    raise Exception(f"Airsonic API error: {error_msg}")
+            return root
+        except ET.ParseError as e:
+            raise Exception(f"Failed to parse Airsonic response: {str(e)}")
+
+def run_parallel(func: Callable, items: Iterable, max_workers: Optional[int] = None) -> List:
+    """map(func, items) on a thread pool capped by fanout_concurrency, keeping request context"""
+    items = list(items)
+    if max_workers is None:
+        max_workers = max(1, int(load_config().get("fanout_concurrency", 8)))
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    # Each task gets its own copy of the caller's context (e.g. the profiling trace)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, func, item) for item in items]
+        return [future.result() for future in futures]
+
+def fan_out(func: Callable) -> Tuple[List[Tuple[Optional[str], object]], List[str]]:
+    """Run func() against every backend in parallel.
+    
+    Returns ([(backend, result)] in config order, problems). A backend that fails or
+    misses backend_timeout is reported in problems instead of holding up the others;
+    only when every backend fails is an exception raised.
+    """
+    config = load_config()
+    names = list(config.get("backends") or {})
+    if len(names) <= 1:
+        return [(active_backend(), func())], []
+    
+    timeout = config.get("backend_timeout", 5)
+    executor = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="backend")
+    futures = {}
+    for name in names:
+        context = contextvars.copy_context()
+        context.run(current_backend.set, name)
+        futures[name] = executor.submit(context.run, func)
+    done, _ = wait(futures.values(), timeout=timeout)
+    # Don't wait for stragglers; their requests finish (or time out) in the background
+    executor.shutdown(wait=False)
+    
+    results, problems = [], []
+    for name, future in futures.items():
+        if future not in done:
+            problems.append(f"{name} timed out after {timeout:g}s")
+        elif future.exception() is not None:
+            problems.append(f"{name}: {future.exception()}")
+        else:
+            results.append((name, future.result()))
+    if not results:
+        raise Exception("; ".join(problems))
+    return results, problems
+
+def interleave(ranked_lists: List[List], key: Callable[..., Tuple]) -> List:
+    """Merge per-backend ranked lists round-robin, dropping items another backend already returned"""
+    if len(ranked_lists) == 1:
+        return ranked_lists[0]
+    merged = []
+    seen = set()
+    for row in zip_longest(*ranked_lists):
+        for item in row:
+            if item is None or key(item) in seen:
+                continue
+            seen.add(key(item))
+            merged.append(item)
+    return merged
+
+def format_problems(problems: List[str]) -> str:
+    return f"Note: skipped backends ({'; '.join(problems)}).\n" if problems else ""
+
+def submit_scrobbles(params: Dict):
+    """Send a scrobbler batch with scrobble.view, split per backend.
+
+    Each backend's group is sent on its own; if any fail, PartialSubmitError names the
+    ids that still need sending, so plays another backend accepted are not resent.
+    """
+    groups: Dict[Optional[str], Tuple[List[str], List[int], List[str]]] = {}
+    for song_id, played_at in zip(params["id"], params["time"]):
+        backend, raw_id = split_id(song_id)
+        ids, times, song_ids = groups.setdefault(backend or active_backend(), ([], [], []))
+        ids.append(raw_id)
+        times.append(played_at)
+        song_ids.append(song_id)
+    unsent, problems = [], []
+    for backend, (ids, times, song_ids) in groups.items():
+        try:
+            with use_backend(backend):
+                response = make_airsonic_request("scrobble.view", {
+                    "id": ids, "time": times, "submission": params["submission"]
+                })
+                parse_xml_response(response)
+        except Exception as e:
+            unsent.extend(song_ids)
+            problems.append(f"{backend}: {str(e)}" if backend else str(e))
+    if unsent:
+        raise PartialSubmitError("; ".join(problems), unsent)
+
+def get_scrobbler() -> Optional[ScrobbleReporter]:
+    """Shared scrobble reporter, or None when scrobbling is disabled in config.json"""
+    config = load_config()
+    if not config.get("scrobble", True):
+        return None
+    with scrobble_lock:
+        if scrobble_state["reporter"] is None:
+            scrobble_state["reporter"] = ScrobbleReporter(
+                submit_scrobbles,
+                spill_path=config.get("scrobble_spill_path", "scrobble_spill.jsonl")
+            )
+        return scrobble_state["reporter"]
+
+def fetch_random_songs(size: int) -> List[Song]:
+    """One getRandomSongs call (Airsonic returns at most 500 songs per call)"""
+    response = make_airsonic_request("getRandomSongs.view", {"size": min(max(size, 1), 500)})
+    return [song_from_element(song) for song in parse_xml_response(response).findall(".//song")]
+
+def get_random_pool() -> Optional[RandomSongPool]:
+    """Shared random song pool, or None when random_pool_size is 0"""
+    config = load_config()
+    size = int(config.get("random_pool_size", 500))
+    if size <= 0:
+        return None
+    with random_pool_lock:
+        if random_pool_state["pool"] is None:
+            random_pool_state["pool"] = RandomSongPool(
+                fetch_random_songs,
+                size=size,
+                low_watermark=int(config.get("random_pool_low_watermark", size // 5)),
+                max_age=float(config.get("random_pool_ttl", 3600))
+            )
+        return random_pool_state["pool"]
+
+def song_from_element(song) -> Song:
+    """Parse a <song>/<entry> element, namespacing its ID with the active backend"""
+    return Song.from_element(song, public_id(song.get("id")))
+
+def get_album(album_id: str):
+    """Fetch an album and its songs, reusing the album cache while it is fresh"""
+    config = load_config()
+    ttl = config.get("album_cache_ttl", 3600)
+    
+    with routed(album_id) as raw_id:
+        # Cache by namespaced id: backends can reuse the same album ids
+        album_id = public_id(raw_id)
+        with album_cache_lock:
+            cached = album_cache.get(album_id)
+        if cached is not None and time.time() - cached[0] < ttl:
+            return cached[1], cached[2]
+        
+        response = make_airsonic_request("getAlbum.view", {"id": raw_id})
+        root = parse_xml_response(response)
+        album = root.find(".//album")
+        if album is None:
+            raise Exception(f"Album {album_id} not found")
+        
+        album_info = Album.from_element(album, album_id)
+        songs = sorted((song_from_element(song) for song in album.findall("song")),
+                       key=lambda s: (s.disc, s.track))
+    
+    with album_cache_lock:
+        max_entries = config.get("album_cache_size", 2000)
+        if album_id not in album_cache and len(album_cache) >= max_entries:
+            # Evict the oldest entry
+            oldest = min(album_cache, key=lambda k: album_cache[k][0])
+            del album_cache[oldest]
+        album_cache[album_id] = (time.time(), album_info, songs)
+    return album_info, songs
+
+def fetch_albums(album_ids: List[str]):
+    """Fetch several albums concurrently, bounded by the configured fan-out cap.
+    
+    Returns (albums, errors) where albums is a list of (album_info, songs) in the
+    order of album_ids and errors maps album ids that failed to their error.
+    """
+    results = {}
+    errors = {}
+    unique_ids = list(dict.fromkeys(album_ids))
+    progress = {"done": 0}
+    progress_lock = threading.Lock()
+    
+    def fetch(album_id):
+        try:
+            results[album_id] = get_album(album_id)
+        except Exception as e:
+            errors[album_id] = str(e)
+        with progress_lock:
+            progress["done"] += 1
+            done = progress["done"]
+            report_progress(done, len(unique_ids), f"Loaded {done} of {len(unique_ids)} albums")
+    
+    run_parallel(fetch, unique_ids)
+    
+    albums = [results[album_id] for album_id in unique_ids if album_id in results]
+    return albums, errors
+
+def merge_album_songs(albums) -> List[Song]:
+    """Merge album track lists, dropping songs that appear on more than one album"""
+    merged = []
+    seen_ids = set()
+    seen_keys = set()
+    for _, songs in albums:
+        for song in songs:
+            key = (song.title.strip().lower(), song.artist.strip().lower(), song.duration)
+            if song.id in seen_ids or key in seen_keys:
+                continue
+            seen_ids.add(song.id)
+            seen_keys.add(key)
+            merged.append(song)
+    return merged
+
+def load_catalog(force: bool = False) -> "SongCatalog":
+    """Return the song catalog, crawling the library via paged search3 when stale"""
+    from catalog import SongCatalog
+    
+    config = load_config()
+    ttl = config.get("catalog_ttl", 21600)
+    
+    with catalog_lock:
+        catalog = catalog_state["catalog"]
+        if catalog is not None and not force and time.time() - catalog_state["loaded_at"] < ttl:
+            return catalog
+        
+        started = time.time()
+        page_size = 500
+        max_workers = max(1, int(config.get("fanout_concurrency", 8)))
+        
+        def fetch_page(page):
+            response = make_airsonic_request("search3.view", {
+                "query": "", "artistCount": 0, "albumCount": 0,
+                "songCount": page_size, "songOffset": page * page_size
+            })
+            root = parse_xml_response(response)
+            return [song_from_element(song) for song in root.findall(".//song")]
+        
+        # Fetch pages in parallel waves until a short page marks the end
+        songs = []
+        page = 0
+        while True:
+            pages = run_parallel(fetch_page, range(page, page + max_workers), max_workers)
+            for batch in pages:
+                songs.extend(batch)
+            page += max_workers
+            report_progress(len(songs), message=f"Crawled {len(songs)} songs")
+            if any(len(batch) < page_size for batch in pages):
+                break
+        
+        # Overlapping pages can repeat songs if the library changes mid-crawl
+        unique = {song.id: song for song in songs}
+        catalog = SongCatalog(unique.values())
+        catalog_state["catalog"] = catalog
+        catalog_state["similarity"] = None
+        catalog_state["suggest"] = None
+        catalog_state["loaded_at"] = time.time()
+        catalog_state["load_seconds"] = time.time() - started
+        return catalog
+
+def fetch_playlist_infos() -> List[Playlist]:
+    """getPlaylists rows (IDs stay backend-local; the cache is per backend)"""
+    response = make_airsonic_request("getPlaylists.view")
+    return [Playlist.from_element(playlist) for playlist in parse_xml_response(response).findall(".//playlist")]
+
+def fetch_playlist(playlist_id: str) -> Playlist:
+    response = make_airsonic_request("getPlaylist.view", {"id": playlist_id})
+    playlist = parse_xml_response(response).find(".//playlist")
+    if playlist is None:
+        raise Exception(f"Playlist {playlist_id} not found")
+    # getPlaylist lists the songs as <entry> elements
+    return Playlist.from_element(playlist, tuple(song_from_element(entry) for entry in playlist.findall("entry")))
+
+def get_playlist_cache() -> PlaylistCache:
+    """Playlist cache of the active backend"""
+    backend = active_backend()
+    with playlist_lock:
+        cache = playlist_caches.get(backend)
+        if cache is None:
+            ttl = float(load_config().get("playlist_cache_ttl", 30))
+            cache = playlist_caches[backend] = PlaylistCache(fetch_playlist_infos, fetch_playlist, list_ttl=ttl)
+        return cache
+
+def fetch_playlist_song_ids() -> List[List[str]]:
+    """Song IDs of every playlist, fetched in parallel (used for co-occurrence features)"""
+    cache = get_playlist_cache()
+    
+    def fetch(info):
+        try:
+            return [song.id for song in cache.get(info.id).songs]
+        except Exception:
+            return []
+    
+    return run_parallel(fetch, cache.listing(refresh=True))
+
+def load_similarity_index() -> "SimilarityIndex":
+    """Return the similarity index for the current catalog, building it on first use"""
+    from similarity import SimilarityIndex
+    
+    catalog = load_catalog()
+    with catalog_lock:
+        index = catalog_state["similarity"]
+        if index is not None and index.catalog is catalog:
+            return index
+        try:
+            playlists = fetch_playlist_song_ids()
+        except Exception:
+            playlists = []
+        index = SimilarityIndex(catalog, playlists)
+        catalog_state["similarity"] = index
+        return index
+
+def load_suggest_index() -> "SuggestIndex":
+    """Return the as-you-type suggestion index for the current catalog, building it on first use"""
+    from suggest import SuggestIndex
+    
+    catalog = load_catalog()
+    with catalog_lock:
+        index = catalog_state["suggest"]
+        if index is None or index.catalog is not catalog:
+            index = SuggestIndex(catalog)
+            catalog_state["suggest"] = index
+        return index
+
+def peek_suggest_index() -> Optional["SuggestIndex"]:
+    """The suggestion index without waiting: None (or the previous index) while it is built.
+    
+    A missing or stale index is built once on a background thread; callers keep getting
+    the previous index, if any, until the new one is ready.
+    """
+    ttl = load_config().get("catalog_ttl", 21600)
+    # Read without catalog_lock, which is held for the whole crawl
+    index = catalog_state["suggest"]
+    catalog = catalog_state["catalog"]
+    fresh = catalog is not None and time.time() - catalog_state["loaded_at"] < ttl
+    if index is not None and index.catalog is catalog and fresh:
+        return index
+    
+    with suggest_warmup_lock:
+        thread = suggest_warmup["thread"]
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=build_suggest_index, name="suggest-warmup", daemon=True)
+            suggest_warmup["thread"] = thread
+            thread.start()
+    return index
+
+def build_suggest_index():
+    """Build the suggestion index (and the catalog if needed), recording any failure"""
     try:
-        # Remove namespaces from XML to simplify parsing
-        content = response.content
-        if isinstance(content, bytes):
-            content = content.decode('utf-8')
-        # Remove namespace declarations
-        content = content.replace('xmlns="http://subsonic.org/restapi"', '')
-        root = ET.fromstring(content)
-        # Check for errors in response
-        status = root.get("status")
-        if status == "failed":
-            error = root.find(".//error")
-            if error is not None:
-                error_msg = error.get("message", "Unknown error")
-                raise Exception(f"Airsonic API error: {error_msg}")
-        return root
-    except ET.ParseError as e:
-        raise Exception(f"Failed to parse Airsonic response: {str(e)}")
+        load_suggest_index()
+        suggest_warmup["error"] = None
+    except Exception as e:
+        suggest_warmup["error"] = str(e)
+
+def format_duration(seconds: int) -> str:
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+def resolve_artist_id(artist: str) -> Optional[str]:
+    """Resolve an artist name or ID to an Airsonic artist ID"""
+    response = make_airsonic_request("search3.view", {
+        "query": artist, "artistCount": 10, "albumCount": 0, "songCount": 0
+    })
+    root = parse_xml_response(response)
+    candidates = root.findall(".//artist")
+    
+    # Prefer an exact (case-insensitive) name match over the first hit, so artists
+    # named with digits only (311, 1349) are found by name before trying them as ids
+    for candidate in candidates:
+        if candidate.get("name", "").strip().lower() == artist.strip().lower():
+            return candidate.get("id")
+    if artist.isdigit():
+        try:
+            parse_xml_response(make_airsonic_request("getArtist.view", {"id": artist}))
+            return artist
+        except Exception:
+            pass
+    return candidates[0].get("id") if candidates else None
 
 # MCP Tool Functions
 def list_albums(size: int = 50) -> str:
     """List albums from Airsonic library"""
     try:
-        response = make_airsonic_request("getAlbumList.view", {"type": "random", "size": size})
-        root = parse_xml_response(response)
+        def fetch():
+            response = make_airsonic_request("getAlbumList.view", {"type": "random", "size": size})
+            root = parse_xml_response(response)
         
-        albums = []
-        # Find albums - namespace is stripped in parse_xml_response
-        album_elements = root.findall(".//album")
-        
-        for album in album_elements:
-            album_id = album.get("id")
-            name = album.get("name", "Unknown")
-            artist = album.get("artist", "Unknown")
-            song_count = album.get("songCount", "0")
-            albums.append({
-                "id": album_id,
-                "name": name,
-                "artist": artist,
-                "song_count": song_count
-            })
+            # Find albums - namespace is stripped in parse_xml_response
+            return [Album.from_element(album, public_id(album.get("id"))) for album in root.findall(".//album")]
+        
+        results, problems = fan_out(fetch)
+        albums = interleave([albums for _, albums in results],
+                            key=lambda a: (a.name.lower(), a.artist.lower()))[:size]
         
         if not albums:
-            return "No albums found in library."
+            return "No albums found in library." + format_problems(problems)
         
         result = f"Found {len(albums)} albums:\n"
         for i, album in enumerate(albums[:20], 1):  # Show first 20
-            result += f"{i}. {album['name']} by {album['artist']} ({album['song_count']} songs, ID: {album['id']})\n"
+            result += f"{i}. {album.name} by {album.artist} ({album.song_count} songs, ID: {album.id})\n"
         
-        return result
+        return result + format_problems(problems)
     except Exception as e:
         return f"Error listing albums: {str(e)}"
 
+def draw_random_songs(count: int) -> List[Song]:
+    """Random songs from the pool (or straight from Airsonic when the pool is disabled)"""
+    pool = get_random_pool()
+    return pool.draw(count) if pool is not None else fetch_random_songs(count)
+
 def get_random_songs(count: int = 20) -> str:
     """Get random songs from library"""
     try:
-        response = make_airsonic_request("getRandomSongs.view", {"size": count})
-        root = parse_xml_response(response)
-        
-        songs = []
-        # Find songs - namespace is stripped in parse_xml_response
-        song_elements = root.findall(".//song")
-        
-        for song in song_elements:
-            song_id = song.get("id")
-            title = song.get("title", "Unknown")
-            artist = song.get("artist", "Unknown")
-            album = song.get("album", "Unknown")
-            duration = song.get("duration", "0")
-            songs.append({
-                "id": song_id,
-                "title": title,
-                "artist": artist,
-                "album": album,
-                "duration": duration
-            })
+        songs = draw_random_songs(int(count))
         
         if not songs:
             return "No songs found in library."
         
         result = f"Random {len(songs)} songs from library:\n"
         for i, song in enumerate(songs, 1):
-            result += f"{i}. {song['title']} by {song['artist']} (ID: {song['id']})\n"
+            result += f"{i}. {song.title} by {song.artist} (ID: {song.id})\n"
         
         return result
     except Exception as e:
@@ -180,96 +640,97 @@ def list_songs(count: int = 10) -> str:
         
         root = parse_xml_response(response)
         
-        songs = []
         # Find songs - namespace is stripped in parse_xml_response
-        song_elements = root.findall(".//song")
-        
-        for song in song_elements:
-            song_id = song.get("id")
-            title = song.get("title", "Unknown")
-            artist = song.get("artist", "Unknown")
-            album = song.get("album", "Unknown")
-            duration = song.get("duration", "0")
-            songs.append({
-                "id": song_id,
-                "title": title,
-                "artist": artist,
-                "album": album,
-                "duration": duration
-            })
+        songs = [song_from_element(song) for song in root.findall(".//song")]
         
         if not songs:
             return "No songs found in library."
         
         result = f"Found {len(songs)} songs from library:\n"
         for i, song in enumerate(songs, 1):
-            result += f"{i}. {song['title']} by {song['artist']} (ID: {song['id']})\n"
+            result += f"{i}. {song.title} by {song.artist} (ID: {song.id})\n"
         
         return result
     except Exception as e:
         return f"Error listing songs: {str(e)}"
 
-def search_songs(query: str) -> str:
-    """Search for songs in Airsonic library"""
-    try:
+def search_song_records(query: str) -> Tuple[List[Song], List[str]]:
+    """(songs matching query on every backend, problems with backends that were skipped)"""
+    def fetch():
         response = make_airsonic_request("search3.view", {"query": query, "songCount": 20})
         root = parse_xml_response(response)
-        
-        songs = []
+    
         # Find songs - namespace is stripped in parse_xml_response
-        song_elements = root.findall(".//song")
-        
-        for song in song_elements:
-            song_id = song.get("id")
-            title = song.get("title", "Unknown")
-            artist = song.get("artist", "Unknown")
-            album = song.get("album", "Unknown")
-            duration = song.get("duration", "0")
-            songs.append({
-                "id": song_id,
-                "title": title,
-                "artist": artist,
-                "album": album,
-                "duration": duration
-            })
+        return [song_from_element(song) for song in root.findall(".//song")]
+    
+    # Each backend ranks its own matches; take their best hits in turn
+    results, problems = fan_out(fetch)
+    songs = interleave([songs for _, songs in results],
+                       key=lambda s: (s.title.lower(), s.artist.lower(), s.album.lower()))
+    return songs, problems
+
+def search_songs(query: str) -> str:
+    """Search for songs in Airsonic library"""
+    try:
+        songs, problems = search_song_records(query)
         
         if not songs:
-            return f"No songs found for query: '{query}'"
+            return f"No songs found for query: '{query}'" + format_problems(problems)
         
         result = f"Found {len(songs)} songs:\n"
         for i, song in enumerate(songs[:10], 1):  # Show first 10
-            result += f"{i}. {song['title']} by {song['artist']} (ID: {song['id']})\n"
+            result += f"{i}. {song.title} by {song.artist} (ID: {song.id})\n"
         
-        return result
+        return result + format_problems(problems)
     except Exception as e:
         return f"Error searching songs: {str(e)}"
 
+def start_playback(song_id: str):
+    """Point the playback state at a new song (song_id may be namespaced with its backend)"""
+    with routed(song_id) as raw_id:
+        config = backend_config()
+        auth_params = get_airsonic_auth_params()
+    server_url = config.get("server_url", "http://localhost:4040")
+    auth_params["id"] = raw_id
+    if config.get("max_bitrate"):
+        auth_params["maxBitRate"] = config["max_bitrate"]
+    
+    playback_state["current_song"] = song_id
+    playback_state["is_playing"] = True
+    playback_state["is_paused"] = False
+    playback_state["current_stream_url"] = f"{server_url}/rest/stream.view?" + "&".join([f"{k}={v}" for k, v in auth_params.items()])
+    playback_state["player_stream_url"] = f"/stream/{song_id}"
+    playback_state["player_hls_url"] = f"/hls/{song_id}/playlist.m3u8" if config.get("stream_mode") == "hls" else None
+    playback_state["seek_position"] = None
+    playback_state["seek_url"] = None
+    playback_state["duration"] = None
+
+    scrobbler = get_scrobbler()
+    if scrobbler:
+        scrobbler.now_playing(song_id)
+
 def play_song(song_id: str) -> str:
     """Start playing a song and return stream URL"""
+    # A song picked directly replaces any playlist or smart shuffle queue
+    playback_state["queue"] = []
+    playback_state["queue_position"] = None
+    return play_queued_song(song_id)
+
+def play_queued_song(song_id: str) -> str:
+    """Start playing a song without touching the queue (queue advance, smart shuffle)"""
     try:
-        config = load_config()
-        server_url = config.get("server_url", "http://localhost:4040")
-        auth_params = get_airsonic_auth_params()
-        
-        # Get stream URL
-        stream_url = f"{server_url}/rest/stream.view"
-        auth_params["id"] = song_id
-        
-        # Update playback state
-        playback_state["current_song"] = song_id
-        playback_state["is_playing"] = True
-        playback_state["is_paused"] = False
-        playback_state["current_stream_url"] = stream_url + "?" + "&".join([f"{k}={v}" for k, v in auth_params.items()])
+        start_playback(song_id)
         
         # Get song info
-        response = make_airsonic_request("getSong.view", {"id": song_id})
+        with routed(song_id) as raw_id:
+            response = make_airsonic_request("getSong.view", {"id": raw_id})
         root = parse_xml_response(response)
-        song = root.find(".//song")
+        element = root.find(".//song")
         
-        if song is not None:
-            title = song.get("title", "Unknown")
-            artist = song.get("artist", "Unknown")
-            return f"Now playing: {title} by {artist}. Stream URL: {playback_state['current_stream_url']}"
+        if element is not None:
+            song = Song.from_element(element, song_id)
+            playback_state["duration"] = song.duration or None
+            return f"Now playing: {song.title} by {song.artist}. Stream URL: {playback_state['current_stream_url']}"
         else:
             return f"Playing song ID: {song_id}. Stream URL: {playback_state['current_stream_url']}"
     except Exception as e:
@@ -305,6 +766,8 @@ def stop_playback() -> str:
     playback_state["is_playing"] = False
     playback_state["is_paused"] = False
     playback_state["current_stream_url"] = None
+    playback_state["player_stream_url"] = None
+    playback_state["player_hls_url"] = None
     return "Playback stopped."
 
 def get_current_song() -> str:
@@ -313,17 +776,15 @@ def get_current_song() -> str:
         return "No song is currently playing."
     
     try:
-        response = make_airsonic_request("getSong.view", {"id": playback_state["current_song"]})
+        with routed(playback_state["current_song"]) as raw_id:
+            response = make_airsonic_request("getSong.view", {"id": raw_id})
         root = parse_xml_response(response)
-        song = root.find(".//song")
+        element = root.find(".//song")
         
-        if song is not None:
-            title = song.get("title", "Unknown")
-            artist = song.get("artist", "Unknown")
-            album = song.get("album", "Unknown")
-            duration = song.get("duration", "0")
+        if element is not None:
+            song = Song.from_element(element, playback_state["current_song"])
             status = "playing" if playback_state["is_playing"] else "paused"
-            return f"Current song: {title} by {artist} from album {album} ({duration}s) - Status: {status}"
+            return f"Current song: {song.title} by {song.artist} from album {song.album} ({song.duration}s) - Status: {status}"
         else:
             return f"Playing song ID: {playback_state['current_song']} - Status: {'playing' if playback_state['is_playing'] else 'paused'}"
     except Exception as e:
@@ -332,28 +793,22 @@ def get_current_song() -> str:
 def get_playlists() -> str:
     """List available playlists"""
     try:
-        response = make_airsonic_request("getPlaylists.view")
-        root = parse_xml_response(response)
+        def fetch():
+            # Listing explicitly asked for: always revalidate against the server
+            return [info._replace(id=public_id(info.id)) for info in get_playlist_cache().listing(refresh=True)]
         
-        playlists = []
-        for playlist in root.findall(".//playlist"):
-            playlist_id = playlist.get("id")
-            name = playlist.get("name", "Unknown")
-            song_count = playlist.get("songCount", "0")
-            playlists.append({
-                "id": playlist_id,
-                "name": name,
-                "song_count": song_count
-            })
+        # Playlists are per-server, so same-named playlists on different backends are all kept
+        results, problems = fan_out(fetch)
+        playlists = [playlist for _, backend_playlists in results for playlist in backend_playlists]
         
         if not playlists:
-            return "No playlists found."
+            return "No playlists found." + format_problems(problems)
         
         result = f"Found {len(playlists)} playlists:\n"
         for playlist in playlists:
-            result += f"- {playlist['name']} (ID: {playlist['id']}, {playlist['song_count']} songs)\n"
+            result += f"- {playlist.name} (ID: {playlist.id}, {playlist.song_count} songs)\n"
         
-        return result
+        return result + format_problems(problems)
     except Exception as e:
         return f"Error getting playlists: {str(e)}"
 
@@ -365,26 +820,33 @@ def seek_to(time_seconds: int) -> str:
     if time_seconds < 0:
         return "Time position must be positive."
     
-    playback_state["seek_position"] = time_seconds
-    
-    # Get song duration to validate
+    # Get song duration to validate before the player is pointed at the new position
+    duration = None
+    note = ""
     try:
-        response = make_airsonic_request("getSong.view", {"id": playback_state["current_song"]})
+        with routed(playback_state["current_song"]) as raw_id:
+            response = make_airsonic_request("getSong.view", {"id": raw_id})
         root = parse_xml_response(response)
         song = root.find(".//song")
-        
         if song is not None:
-            duration = int(song.get("duration", "0"))
-            if time_seconds > duration:
-                return f"Time position {time_seconds}s exceeds song duration of {duration}s."
-            
-            minutes = time_seconds // 60
-            seconds = time_seconds % 60
-            return f"Seeking to {minutes}:{seconds:02d} in the current song."
-        else:
-            return f"Seeking to {time_seconds}s in the current song."
+            duration = int(song.get("duration", "0")) or None
+            playback_state["duration"] = duration
     except Exception as e:
-        return f"Seeking to {time_seconds}s. Note: {str(e)}"
+        note = f" Note: {str(e)}"
+    
+    if duration is not None and time_seconds > duration:
+        return f"Time position {time_seconds}s exceeds song duration of {duration}s."
+    
+    playback_state["seek_position"] = time_seconds
+    # The player switches to this stream when the target is not buffered yet, so a
+    # transcoded stream restarts at the target instead of downloading everything before it
+    playback_state["seek_url"] = f"/stream/{playback_state['current_song']}?timeOffset={time_seconds}"
+    
+    if duration is not None:
+        minutes = time_seconds // 60
+        seconds = time_seconds % 60
+        return f"Seeking to {minutes}:{seconds:02d} in the current song."
+    return f"Seeking to {time_seconds}s in the current song.{note}"
 
 def set_volume(volume: int) -> str:
     """Set the volume level (0-100 percentage)"""
@@ -409,36 +871,199 @@ def unmute() -> str:
 def play_playlist(playlist_id: str) -> str:
     """Play a playlist (starts with first song)"""
     try:
-        response = make_airsonic_request("getPlaylist.view", {"id": playlist_id})
-        root = parse_xml_response(response)
+        with routed(playlist_id) as raw_id:
+            playlist = get_playlist_cache().get(raw_id)
         
-        playlist_name = root.find(".//playlist").get("name", "Unknown Playlist")
-        songs = root.findall(".//song")
+        if not playlist.songs:
+            return f"Playlist '{playlist.name}' is empty."
         
-        if not songs:
-            return f"Playlist '{playlist_name}' is empty."
+        # Play first song and queue the rest, so play_next walks the playlist
+        first_song = playlist.songs[0]
+        start_playback(first_song.id)
+        playback_state["duration"] = first_song.duration or None
+        playback_state["queue"] = [song.id for song in playlist.songs]
+        playback_state["queue_position"] = 0
         
-        # Play first song
-        first_song = songs[0]
-        song_id = first_song.get("id")
-        title = first_song.get("title", "Unknown")
-        artist = first_song.get("artist", "Unknown")
+        return f"Playing playlist '{playlist.name}': {first_song.title} by {first_song.artist} (first of {len(playlist.songs)} songs). Stream URL: {playback_state['current_stream_url']}"
+    except Exception as e:
+        return f"Error playing playlist: {str(e)}"
+
+def play_playlist_by_name(name: str) -> str:
+    """Play a playlist by name (exact match, case-insensitive, or a unique partial match)"""
+    try:
+        def find():
+            return [(public_id(info.id), info.name) for info in get_playlist_cache().find(name)]
         
-        # Update state
-        playback_state["current_song"] = song_id
-        playback_state["is_playing"] = True
-        playback_state["is_paused"] = False
+        results, problems = fan_out(find)
+        matches = [match for _, backend_matches in results for match in backend_matches]
+        # Prefer exact names when a partial match also hit another playlist
+        exact = [match for match in matches if match[1].casefold() == name.strip().casefold()]
+        if exact:
+            matches = exact
         
-        config = load_config()
-        server_url = config.get("server_url", "http://localhost:4040")
-        auth_params = get_airsonic_auth_params()
-        auth_params["id"] = song_id
-        playback_state["current_stream_url"] = f"{server_url}/rest/stream.view?" + "&".join([f"{k}={v}" for k, v in auth_params.items()])
+        if not matches:
+            return f"No playlist named '{name}'." + format_problems(problems)
+        if len(matches) > 1:
+            result = f"Several playlists match '{name}':\n"
+            for playlist_id, playlist_name in matches:
+                result += f"- {playlist_name} (ID: {playlist_id})\n"
+            return result + "Use play_playlist with one of these IDs."
         
-        return f"Playing playlist '{playlist_name}': {title} by {artist} (first of {len(songs)} songs). Stream URL: {playback_state['current_stream_url']}"
+        return play_playlist(matches[0][0])
     except Exception as e:
         return f"Error playing playlist: {str(e)}"
 
+def get_album_tracks(album_id: str) -> str:
+    """List all tracks on an album"""
+    try:
+        album, songs = get_album(album_id)
+        
+        if not songs:
+            return f"Album '{album.name}' has no songs."
+        
+        result = f"Album '{album.name}' by {album.artist} ({len(songs)} songs):\n"
+        for i, song in enumerate(songs, 1):
+            result += f"{i}. {song.title} by {song.artist} (ID: {song.id})\n"
+        
+        return result
+    except Exception as e:
+        return f"Error getting album tracks: {str(e)}"
+
+def get_artist_discography(artist: str) -> str:
+    """List all songs by an artist, fetching the artist's albums in parallel"""
+    try:
+        with routed(artist) as artist:
+            artist_id = resolve_artist_id(artist)
+            if artist_id is None:
+                return f"No artist found for: '{artist}'"
+            
+            response = make_airsonic_request("getArtist.view", {"id": artist_id})
+            root = parse_xml_response(response)
+            artist_element = root.find(".//artist")
+            artist_name = artist_element.get("name", artist) if artist_element is not None else artist
+            album_ids = [album.get("id") for album in root.findall(".//album")]
+            
+            if not album_ids:
+                return f"No albums found for artist '{artist_name}'."
+            
+            albums, errors = fetch_albums(album_ids)
+        # Oldest albums first so originals win over later compilations
+        albums.sort(key=lambda album: album[0].year or 9999)
+        songs = merge_album_songs(albums)
+        
+        if not songs:
+            return f"No songs found for artist '{artist_name}'."
+        
+        result = f"Found {len(songs)} songs across {len(albums)} albums by {artist_name}:\n"
+        for i, song in enumerate(songs, 1):
+            result += f"{i}. {song.title} by {song.artist} (ID: {song.id})\n"
+        if errors:
+            result += f"Note: {len(errors)} albums could not be loaded.\n"
+        
+        return result
+    except Exception as e:
+        return f"Error getting artist discography: {str(e)}"
+
+def find_songs(filter: str = "", sort: str = "", limit: int = 20) -> str:
+    """Find songs matching attribute filters using the in-memory catalog"""
+    try:
+        catalog = load_catalog()
+        started = time.perf_counter()
+        rows, total = catalog.query(filter, sort, int(limit))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        if total == 0:
+            return f"No songs match: '{filter}'"
+        
+        result = f"Found {total} matching songs in {elapsed_ms:.1f} ms (showing {len(rows)}):\n"
+        for i, row in enumerate(rows, 1):
+            song = catalog.row(row)
+            result += (f"{i}. {song.title} by {song.artist} (ID: {song.id}) - "
+                       f"{song.album}, {song.year or '?'}, {format_duration(song.duration)}, "
+                       f"{song.bitrate} kbps, {song.genre}\n")
+        
+        return result
+    except ValueError as e:
+        return f"Invalid query: {str(e)}. Fields: duration, year, bitrate, bpm, play_count, starred, genre, artist, album, title."
+    except Exception as e:
+        return f"Error finding songs: {str(e)}"
+
+def refresh_catalog() -> str:
+    """Reload the in-memory song catalog from Airsonic"""
+    try:
+        catalog = load_catalog(force=True)
+        rows = len(catalog)
+        nbytes = catalog.nbytes()
+        per_million = nbytes / rows * 1_000_000 / (1024 * 1024) if rows else 0
+        return (f"Catalog loaded: {rows} songs in {catalog_state['load_seconds']:.1f}s, "
+                f"{nbytes / (1024 * 1024):.1f} MB ({per_million:.0f} MB per million rows).")
+    except Exception as e:
+        return f"Error refreshing catalog: {str(e)}"
+
+def get_similar_songs(song_id: str, count: int = 10) -> str:
+    """List songs similar to a seed song (artist, genre, era, tempo and playlist co-occurrence)"""
+    try:
+        index = load_similarity_index()
+        if song_id not in index.row_of:
+            return f"Song ID {song_id} is not in the catalog. Try refresh_catalog if it was added recently."
+        
+        rows = index.similar(song_id, int(count))
+        if not rows:
+            return f"No similar songs found for song ID {song_id}."
+        
+        seed = index.catalog.row(index.row_of[song_id])
+        result = f"Songs similar to {seed.title} by {seed.artist}:\n"
+        for i, row in enumerate(rows, 1):
+            song = index.catalog.row(row)
+            result += f"{i}. {song.title} by {song.artist} (ID: {song.id})\n"
+        
+        return result
+    except Exception as e:
+        return f"Error finding similar songs: {str(e)}"
+
+def smart_shuffle(song_id: str, count: int = 20) -> str:
+    """Queue songs that flow on from a seed song and start playing the seed"""
+    try:
+        index = load_similarity_index()
+        if song_id not in index.row_of:
+            return f"Song ID {song_id} is not in the catalog. Try refresh_catalog if it was added recently."
+        
+        rows = index.smart_shuffle(song_id, int(count))
+        playback_state["queue"] = [index.catalog.ids[row] for row in rows]
+        playback_state["queue_position"] = 0
+        
+        play_result = play_queued_song(song_id)
+        result = f"Smart shuffle queued {len(rows)} songs. {play_result.split(' Stream URL:')[0]}\nUp next:\n"
+        for i, row in enumerate(rows[1:], 1):
+            song = index.catalog.row(row)
+            result += f"{i}. {song.title} by {song.artist} (ID: {song.id})\n"
+        
+        return result
+    except Exception as e:
+        return f"Error starting smart shuffle: {str(e)}"
+
+def play_next() -> str:
+    """Play the next song in the queue"""
+    queue = playback_state["queue"]
+    position = playback_state["queue_position"]
+    if not queue or position is None or position + 1 >= len(queue):
+        return "The queue is empty."
+    
+    playback_state["queue_position"] = position + 1
+    return play_queued_song(queue[position + 1])
+
+def song_ended() -> str:
+    """Report the current song as played, then continue with the queue"""
+    song_id = playback_state["current_song"]
+    if song_id:
+        try:
+            scrobbler = get_scrobbler()
+            if scrobbler:
+                scrobbler.played(song_id)
+        except Exception:
+            pass  # Scrobbling must never stop playback
+    return play_next()
+
 # MCP Tool Definitions
 SEARCH_SONGS_TOOL = Tool(
     name="search_songs",
@@ -488,6 +1113,12 @@ PLAY_PLAYLIST_TOOL = Tool(
     parameters=[ToolParameter(name="playlist_id", type="string")]
 )
 
+PLAY_PLAYLIST_BY_NAME_TOOL = Tool(
+    name="play_playlist_by_name",
+    description="Play a playlist by its name (no need to list playlists first)",
+    parameters=[ToolParameter(name="name", type="string")]
+)
+
 LIST_ALBUMS_TOOL = Tool(
     name="list_albums",
     description="List albums from the Airsonic music library",
@@ -530,6 +1161,62 @@ UNMUTE_TOOL = Tool(
     parameters=[]
 )
 
+GET_ALBUM_TRACKS_TOOL = Tool(
+    name="get_album_tracks",
+    description="List all tracks on an album by its ID (use list_albums to find album IDs)",
+    parameters=[ToolParameter(name="album_id", type="string")]
+)
+
+GET_ARTIST_DISCOGRAPHY_TOOL = Tool(
+    name="get_artist_discography",
+    description="List all songs by an artist across all of their albums (artist name or ID)",
+    parameters=[ToolParameter(name="artist", type="string")]
+)
+
+FIND_SONGS_TOOL = Tool(
+    name="find_songs",
+    description=("Find songs by attributes. filter: clauses joined by 'and' over duration (seconds or m:ss), "
+                 "year (or a decade like 90s), bitrate, bpm, play_count, starred, genre, artist, album, title; "
+                 "operators = != < <= > >= and ~ (text contains); quote values containing 'and' or commas. Example: 'year>=1990 and year<2000 and duration<4:00 and bitrate>=256 and genre=Jazz'. "
+                 "sort: comma-separated fields (any filter field, including title), '-' prefix for descending "
+                 "(e.g. '-play_count' or 'artist,title'). limit: max results"),
+    parameters=[
+        ToolParameter(name="filter", type="string"),
+        ToolParameter(name="sort", type="string"),
+        ToolParameter(name="limit", type="number")
+    ]
+)
+
+REFRESH_CATALOG_TOOL = Tool(
+    name="refresh_catalog",
+    description="Reload the song catalog used by find_songs (after library changes) and report its size",
+    parameters=[]
+)
+
+GET_SIMILAR_SONGS_TOOL = Tool(
+    name="get_similar_songs",
+    description="Find songs similar to a song by its ID (play something like this)",
+    parameters=[
+        ToolParameter(name="song_id", type="string"),
+        ToolParameter(name="count", type="number")
+    ]
+)
+
+SMART_SHUFFLE_TOOL = Tool(
+    name="smart_shuffle",
+    description="Play a song and queue similar songs after it, ordered to flow naturally",
+    parameters=[
+        ToolParameter(name="song_id", type="string"),
+        ToolParameter(name="count", type="number")
+    ]
+)
+
+PLAY_NEXT_TOOL = Tool(
+    name="play_next",
+    description="Skip to the next song in the queue",
+    parameters=[]
+)
+
 # Export all tools
 ALL_TOOLS = [
     SEARCH_SONGS_TOOL,
@@ -546,6 +1233,72 @@ ALL_TOOLS = [
     UNMUTE_TOOL,
     GET_CURRENT_SONG_TOOL,
     GET_PLAYLISTS_TOOL,
-    PLAY_PLAYLIST_TOOL
+    PLAY_PLAYLIST_TOOL,
+    PLAY_PLAYLIST_BY_NAME_TOOL,
+    GET_ALBUM_TRACKS_TOOL,
+    GET_ARTIST_DISCOGRAPHY_TOOL,
+    FIND_SONGS_TOOL,
+    REFRESH_CATALOG_TOOL,
+    GET_SIMILAR_SONGS_TOOL,
+    SMART_SHUFFLE_TOOL,
+    PLAY_NEXT_TOOL
 ]
 
+
+# Tool registry mapping function names to functions
+tool_registry = {
+    "search_songs": search_songs,
+    "list_songs": list_songs,
+    "list_albums": list_albums,
+    "get_random_songs": get_random_songs,
+    "play_song": play_song,
+    "pause_playback": pause_playback,
+    "resume_playback": resume_playback,
+    "stop_playback": stop_playback,
+    "seek_to": seek_to,
+    "set_volume": set_volume,
+    "mute": mute,
+    "unmute": unmute,
+    "get_current_song": get_current_song,
+    "get_playlists": get_playlists,
+    "play_playlist": play_playlist,
+    "play_playlist_by_name": play_playlist_by_name,
+    "get_album_tracks": get_album_tracks,
+    "get_artist_discography": get_artist_discography,
+    "find_songs": find_songs,
+    "refresh_catalog": refresh_catalog,
+    "get_similar_songs": get_similar_songs,
+    "smart_shuffle": smart_shuffle,
+    "play_next": play_next,
+}
+
+def list_tools() -> List[Dict]:
+    """Tool descriptions in the MCP tools/list format"""
+    return [
+        {
+            "name": tool.name,
+            "description": tool.description,
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    param.name: {"type": param.type}
+                    for param in tool.parameters
+                },
+                "required": [param.name for param in tool.parameters]
+            }
+        }
+        for tool in ALL_TOOLS
+    ]
+
+def prepare_tool_call(tool_name: str, arguments: Optional[Dict]) -> Callable[[], str]:
+    """Bind a registered tool to the arguments it accepts, ready to run"""
+    tool_function = tool_registry[tool_name]
+    
+    # Filter out empty string arguments (Groq sometimes sends empty strings)
+    filtered_arguments = {k: v for k, v in (arguments or {}).items() if v != "" and v is not None}
+    
+    # Only pass arguments that the function actually accepts
+    param_names = list(inspect.signature(tool_function).parameters.keys())
+    final_arguments = {k: v for k, v in filtered_arguments.items() if k in param_names}
+    
+    return lambda: tool_function(**final_arguments)
@@ -0,0 +1,171 @@
+import json
+import re
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import parse_qsl
+
+# Request bodies larger than this are recorded by size only
+MAX_RECORDED_BODY = 64 * 1024
+
+# Query/body keys that may carry credentials (Subsonic u/p/t/s, jwt, tokens, passwords)
+SECRET_KEYS = {"u", "p", "t", "s", "jwt"}
+SECRET_PATTERN = re.compile(r"pass|token|secret|auth|salt|key|cookie", re.IGNORECASE)
+
+# MCP protocol fields that match SECRET_PATTERN but carry no credentials; a replayed
+# call needs its progressToken to be answered over SSE like the recorded one
+PROTOCOL_KEYS = {"progressToken"}
+
+
+def is_secret(key: str) -> bool:
+    if key in PROTOCOL_KEYS:
+        return False
+    return key in SECRET_KEYS or bool(SECRET_PATTERN.search(key))
+
+
+def scrub(value):
+    """Copy of a JSON value without credential-looking keys"""
+    if isinstance(value, dict):
+        return {k: scrub(v) for k, v in value.items() if not is_secret(str(k))}
+    if isinstance(value, list):
+        return [scrub(v) for v in value]
+    return value
+
+
+def describe_body(body: Dict) -> Dict:
+    """JSON-RPC method and tool name of an MCP request body (any of the supported formats)"""
+    fields = {}
+    if body.get("method") or body.get("verb"):
+        fields["rpc"] = body.get("method") or body["verb"]
+    params = body.get("params") if isinstance(body.get("params"), dict) else {}
+    tool = params.get("name") if body.get("method") == "tools/call" else body.get("tool_name") or body.get("name")
+    if tool:
+        fields["tool"] = tool
+    if body.get("action"):
+        fields["tool"] = f"control:{body['action']}"
+    return fields
+
+
+class TrafficRecorder:
+    """Appends one compact JSON line per request to a log that replay_traffic.py re-drives.
+
+    Recorded: start time, method, path, scrubbed query and JSON body, JSON-RPC method and
+    tool name, status, time to first byte, total time and byte counts. Client addresses
+    and MCP session ids are replaced by stable aliases ("c1", "s1"), so the log keeps the
+    traffic's shape (who talks in which session) without identifying anyone. Credentials
+    are never written.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "a", buffering=1)
+        self.lock = threading.Lock()
+        self.aliases: Dict[str, Dict[str, str]] = {}
+
+    def alias(self, kind: str, value: Optional[str]) -> Optional[str]:
+        if not value:
+            return None
+        with self.lock:
+            aliases = self.aliases.setdefault(kind, {})
+            alias = aliases.get(value)
+            if alias is None:
+                alias = aliases[value] = f"{kind}{len(aliases) + 1}"
+            return alias
+
+    def record(self, entry: Dict):
+        line = json.dumps({k: v for k, v in entry.items() if v is not None}, separators=(",", ":"))
+        with self.lock:
+            self.file.write(line + "\n")
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def client_address(scope, headers: Dict[str, str]) -> Optional[str]:
+    """Same client identification as main.get_client_id (proxy headers first)"""
+    forwarded = headers.get("cf-connecting-ip") or headers.get("x-forwarded-for")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else None
+
+
+class TrafficRecorderMiddleware:
+    """ASGI middleware feeding a TrafficRecorder.
+
+    Plain ASGI rather than @app.middleware("http"), so streamed responses (audio, SSE)
+    pass through untouched and are measured until their last byte.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder, skip_prefixes=("/theme/", "/debug/")):
+        self.app = app
+        self.recorder = recorder
+        self.skip_prefixes = tuple(skip_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.time()
+        started = time.perf_counter()
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        body = bytearray()
+        state = {"bytes_in": 0, "status": None, "ttfb": None, "bytes_out": 0, "session": None}
+
+        async def receive_recording():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunk = message.get("body", b"")
+                state["bytes_in"] += len(chunk)
+                if len(body) + len(chunk) <= MAX_RECORDED_BODY:
+                    body.extend(chunk)
+            return message
+
+        async def send_recording(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+                for key, value in message.get("headers", []):
+                    if key.lower() == b"mcp-session-id":
+                        state["session"] = value.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                if state["ttfb"] is None:
+                    state["ttfb"] = time.perf_counter() - started
+                state["bytes_out"] += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_recording, send_recording)
+        finally:
+            self.recorder.record(self.entry(scope, headers, bytes(body), state, started_at, started))
+
+    def entry(self, scope, headers: Dict[str, str], body: bytes, state: Dict,
+              started_at: float, started: float) -> Dict:
+        query = {k: v for k, v in parse_qsl(scope.get("query_string", b"").decode("latin-1")) if not is_secret(k)}
+        entry = {
+            "t": round(started_at, 3),
+            "method": scope["method"],
+            "path": scope["path"],
+            "query": query or None,
+            "client": self.recorder.alias("c", client_address(scope, headers)),
+            # The session a request belongs to, or the one its response created (initialize)
+            "session": self.recorder.alias("s", headers.get("mcp-session-id") or state["session"]),
+            "sse": 1 if "text/event-stream" in headers.get("accept", "") else None,
+        }
+        if body and state["bytes_in"] <= MAX_RECORDED_BODY:
+            try:
+                parsed = json.loads(body)
+            except ValueError:
+                parsed = None
+            if isinstance(parsed, dict):
+                entry.update(describe_body(parsed))
+                entry["body"] = scrub(parsed)
+        entry.update({
+            "status": state["status"] or 500,
+            "ttfb_ms": round(state["ttfb"] * 1000, 2) if state["ttfb"] is not None else None,
+            "ms": round((time.perf_counter() - started) * 1000, 2),
+            "bytes_in": state["bytes_in"] or None,
+            "bytes_out": state["bytes_out"],
+        })
+        return entry